@@ -0,0 +1,181 @@
+import argparse
+import copy
+import json
+import platform
+import time
+import tracemalloc
+import light_up_puzzle as puzzle_class
+import light_up_puzzle_config as config_class
+import light_up_puzzle_profile as profile_class
+
+
+# Boards benchmarked by default: the shipped configs, plus boards generated from GENERATED_BASE_CONFIG
+SHIPPED_CONFIGS = ['config/default.cfg', 'config/random_gen.cfg', 'config/website_puzzle.cfg']
+GENERATED_BASE_CONFIG = 'config/random_gen.cfg'
+GENERATED_DIMENSIONS = [25, 50, 100]
+GENERATED_DENSITIES = [0.1, 0.2, 0.3]
+CLASSIC_GENERATOR_DENSITY = 0.2 # Density of the boards generated with the classic (not linear) generator
+
+# Search loops timed per throughput figure, the fastest one being kept
+THROUGHPUT_REPEATS = 3
+
+# Metrics compared by --compare (True if higher is better)
+COMPARED_METRICS = {'evals_per_sec': True, 'bitboard_evals_per_sec': True, 'placements_per_sec': True, 'generation_time': False, 'peak_memory_bytes': False}
+
+
+def get_cases():
+  """Returns the benchmark matrix as a list of (case name, config) pairs."""
+  cases = []
+
+  for config_file in SHIPPED_CONFIGS:
+    cases.append((config_file, config_class.LightUpPuzzleConfig(config_file)))
+
+  for dimension in GENERATED_DIMENSIONS:
+    for density in GENERATED_DENSITIES:
+      cases.append(('generated %ix%i density %.2f' % (dimension, dimension, density), get_generated_config(dimension, density, 'linear')))
+
+    cases.append(('generated %ix%i density %.2f classic' % (dimension, dimension, CLASSIC_GENERATOR_DENSITY), get_generated_config(dimension, CLASSIC_GENERATOR_DENSITY, 'classic')))
+
+  return cases
+
+
+def get_generated_config(dimension, density, board_generator):
+  """Returns a config generating dimension by dimension boards of the given density with board_generator."""
+  config = config_class.LightUpPuzzleConfig(GENERATED_BASE_CONFIG)
+  config.settings["generate_board"] = 1
+  config.settings["board_generator"] = board_generator
+  config.settings["override_random_board_dimensions"] = 1
+  config.settings["override_num_rows"] = dimension
+  config.settings["override_num_cols"] = dimension
+  config.settings["black_square_placement_prob"] = density
+  return config
+
+
+def run_search(puzzle, num_evals):
+  """Runs num_evals evaluations of the random search loop used by main.py on puzzle."""
+  for eval_count in range(num_evals):
+    if not puzzle.place_bulb_randomly():
+      puzzle.clear_board()
+
+    puzzle.score()
+
+
+def get_evals_per_sec(configs, num_evals, seed):
+  """Returns the evaluations per second of run_search() on a new puzzle for each of configs.
+
+  Each figure is the fastest of THROUGHPUT_REPEATS runs. The configs take turns, so machine load
+  affects them alike.
+  """
+  search_times = [[] for config in configs]
+
+  for repeat in range(THROUGHPUT_REPEATS):
+    for index, config in enumerate(configs):
+      puzzle = puzzle_class.LightUpPuzzle(config, seed)
+      start_time = time.perf_counter()
+      run_search(puzzle, num_evals)
+      search_times[index].append(time.perf_counter() - start_time)
+
+  return [num_evals / min(times) for times in search_times]
+
+
+def benchmark_case(config, num_evals, num_generations, seed):
+  """Benchmarks one board configuration and returns its results as a dictionary."""
+  config = copy.deepcopy(config)
+  result = {}
+
+  # Board generation (or reading), averaged over num_generations seeds
+  profiler = profile_class.LightUpPuzzleProfiler()
+  start_time = time.perf_counter()
+
+  for generation in range(num_generations):
+    puzzle = puzzle_class.LightUpPuzzle(config, seed + generation)
+
+    if config.settings["generate_board"]:
+      profiler.add('generate_linear_board' if config.settings["board_generator"] == 'linear' else 'generate_random_board', puzzle.num_generation_attempts, puzzle.generator_time)
+
+  result['generation_time'] = (time.perf_counter() - start_time) / num_generations
+  result['num_rows'] = puzzle.num_rows
+  result['num_cols'] = puzzle.num_cols
+  result['num_black_squares'] = puzzle.board.num_black_squares
+
+  # Search loop throughput, and that of the bitboard fitness backend relative to it
+  bitboard_config = copy.deepcopy(config)
+  bitboard_config.settings["fitness_backend"] = 'bitboard'
+  result['evals_per_sec'], result['bitboard_evals_per_sec'] = get_evals_per_sec([config, bitboard_config], num_evals, seed)
+  result['bitboard_speedup'] = result['bitboard_evals_per_sec'] / result['evals_per_sec']
+
+  # Per-function timing (on a separate instance so the wrappers don't slow the loop above). score() may
+  # call check_valid_solution(), so its time counts towards both functions' 'time' but only one 'exclusive_time'
+  puzzle = puzzle_class.LightUpPuzzle(config, seed)
+  profiler.instrument(puzzle.board, 'place_bulb')
+  profiler.instrument(puzzle, 'score')
+  profiler.instrument(puzzle, 'check_valid_solution')
+  run_search(puzzle, num_evals)
+  stats = profiler.stats
+
+  for name in stats:
+    stats[name]['calls_per_sec'] = stats[name]['calls'] / stats[name]['time'] if stats[name]['time'] else 0.0
+
+  result['placements_per_sec'] = stats['place_bulb']['calls_per_sec']
+  result['functions'] = stats
+
+  # Peak memory of generating the board and searching it
+  tracemalloc.start()
+  puzzle = puzzle_class.LightUpPuzzle(config, seed)
+  run_search(puzzle, num_evals)
+  result['peak_memory_bytes'] = tracemalloc.get_traced_memory()[1]
+  tracemalloc.stop()
+
+  return result
+
+
+def compare_results(old_results, new_results, threshold):
+  """Prints how each metric changed between two benchmark results, flagging regressions beyond threshold."""
+  old_cases = dict((case['name'], case) for case in old_results['cases'])
+
+  for case in new_results['cases']:
+    if not case['name'] in old_cases:
+      continue
+
+    for metric, higher_is_better in sorted(COMPARED_METRICS.items()):
+      old_value = old_cases[case['name']][metric]
+      new_value = case[metric]
+
+      if not old_value:
+        continue
+
+      change = (new_value - old_value) / old_value
+      regressed = (change < -threshold) if higher_is_better else (change > threshold)
+      print('%-40s %-20s %14.6g -> %14.6g (%+.1f%%)%s' % (case['name'], metric, old_value, new_value, change * 100, '  REGRESSION' if regressed else ''))
+
+
+if __name__ == '__main__':
+
+  parser = argparse.ArgumentParser(description='Benchmarks the light up puzzle search engine over a matrix of boards.')
+  parser.add_argument('--output', default='output/benchmark.json', help='JSON results file (default: output/benchmark.json)')
+  parser.add_argument('--evals', type=int, default=10000, help='evaluations per board (default: 10000)')
+  parser.add_argument('--generations', type=int, default=5, help='boards generated per case when timing generation (default: 5)')
+  parser.add_argument('--seed', type=int, default=123456789, help='seed of the first run (default: 123456789)')
+  parser.add_argument('--compare', metavar='FILE', help='earlier JSON results file to compare against')
+  parser.add_argument('--threshold', type=float, default=0.1, help='relative change reported as a regression, or bitboard slowdown reported (default: 0.1)')
+  args = parser.parse_args()
+
+  results = {'python_version': platform.python_version(), 'timestamp': time.time(), 'num_evals': args.evals, 'seed': args.seed, 'cases': []}
+
+  for name, config in get_cases():
+    case = benchmark_case(config, args.evals, args.generations, args.seed)
+    case['name'] = name
+    results['cases'].append(case)
+
+    print('%-40s %9.0f evals/s %5.2fx bitboard %10.0f placements/s %9.4f s generation %10i bytes peak%s' % (name, case['evals_per_sec'], case['bitboard_speedup'], case['placements_per_sec'], case['generation_time'],
+          case['peak_memory_bytes'], '  BITBOARD SLOWER' if case['bitboard_speedup'] < 1 - args.threshold else ''))
+
+    for function_name, stats in case['functions'].items():
+      print('  %-38s %9i calls %10.6f s inclusive %10.6f s exclusive' % (function_name, stats['calls'], stats['time'], stats['exclusive_time']))
+
+  with open(args.output, 'w') as output_file:
+    json.dump(results, output_file, indent=2)
+
+  if args.compare:
+    with open(args.compare, 'r') as compare_file:
+      compare_results(json.load(compare_file), results, args.threshold)
@@ -0,0 +1,45 @@
+import argparse
+import light_up_puzzle as puzzle_class
+import light_up_puzzle_binary as binary
+
+
+def read_board(file_path, adj_value_dont_care):
+  """Reads a puzzle file (text or binary) or a solution file and returns its board."""
+  if not binary.is_binary_puzzle_file(file_path) and puzzle_class.is_soln_file(file_path):
+    return puzzle_class.read_soln_file(file_path, adj_value_dont_care)
+
+  return puzzle_class.read_puzzle_file(file_path, adj_value_dont_care)
+
+
+def get_output_format(file_path):
+  """Returns the output format implied by the name of file_path."""
+  if file_path.endswith('.lup'):
+    return 'binary'
+
+  if file_path.endswith('_soln.txt'):
+    return 'soln'
+
+  return 'puzzle'
+
+
+if __name__ == '__main__':
+
+  parser = argparse.ArgumentParser(description='Converts light up puzzles between the text puzzle, solution and binary formats.')
+  parser.add_argument('input_file', help='puzzle file (text or binary) or solution file; the format is detected from its contents')
+  parser.add_argument('output_file', help='file to write')
+  parser.add_argument('--format', choices=['binary', 'puzzle', 'soln'], help='output format (default: binary for .lup files, soln for *_soln.txt files, puzzle otherwise)')
+  parser.add_argument('--adj-value-dont-care', type=int, default=5, help='adjacency value of black squares without a quota (default: 5)')
+  args = parser.parse_args()
+
+  board = read_board(args.input_file, args.adj_value_dont_care)
+  output_format = args.format if args.format else get_output_format(args.output_file)
+
+  if output_format == 'binary':
+    binary.write_binary_puzzle_file(args.output_file, board)
+
+  elif output_format == 'soln':
+    with open(args.output_file, 'w') as soln_file:
+      soln_file.write(puzzle_class.get_soln_str(board, board.num_lit_squares))
+
+  else:
+    puzzle_class.write_puzzle_file(args.output_file, board)
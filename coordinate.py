@@ -1,5 +1,7 @@
 class Coordinate:
   """Initializes the coordinate class."""
+  __slots__ = ('x', 'y')
+
   def __init__(self, x, y):
     self.x = x
     self.y = y
@@ -1,49 +1,153 @@
+import argparse
+import os
+import matplotlib
+matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import numpy as np
 
-# The run data for each experiment's fittest solution was scraped from the log files and put in the following files for easy access
-soln_data_files = ['random_gen_soln_data.txt', 'website_puzzle_soln_data.txt']
+# Graphs the fitness trajectory files written by main.py when trajectory_interval is not 0 (see
+# light_up_puzzle_trajectory.py). Row 0 of a trajectory file holds the evaluation numbers it was
+# sampled at, and every other row the best fitness of one run at those evaluations.
+#
+# Text log files (log_format 'text') and the *_soln_data.txt files scraped from them can be graphed
+# too. Their fitness records ('Run <run>', then '<evaluation>\t<fitness>') are turned into the same
+# rows, sampled at every evaluation where some run improved.
 
-# Formatting parameters
-soln_data_titles = ['Randomly Generated Puzzles', 'Provided Puzzle']
-soln_scales = [250, 300]
+# File name endings replaced by '_graph.png' to name a graph
+GRAPH_FILE_SUFFIXES = ['_trajectory.npy', '_data.txt', '_log.txt']
 
-for index, file_name in enumerate(soln_data_files):
-    with open(file_name, 'r') as file:
-        eval_list = []
-        fitness_list = []
-        
-        # Read the input file into the above lists
-        line_count = -1
+# The run data for each experiment's fittest solution was scraped from the log files and put in the
+# following files (next to this script), graphed when no files are given
+SOLN_DATA_FILES = ['random_gen_soln_data.txt', 'website_puzzle_soln_data.txt']
+SOLN_DATA_TITLES = ['Randomly Generated Puzzles', 'Provided Puzzle']
+SOLN_DATA_SUBTITLE = 'without enforcing black cell number constraint'
 
-        for line in file:
-            line_count += 1
 
-            if line_count == 1:
-                split_line = [int(_) for _ in line.split('\t')]
+def load_trajectories(file_path):
+    """Memory-maps the trajectory file at file_path, returning its evaluation numbers and its runs' rows.
 
-                eval_list.append(split_line[0])
-                fitness_list.append(split_line[1])
+    Nothing is read from disk until the arrays are used.
+    """
+    trajectories = np.load(file_path, mmap_mode='r')
+    return trajectories[0], trajectories[1:]
+
+
+def read_text_trajectories(file_path):
+    """Reads the fitness records of a text log file, returning its evaluation numbers and its runs' rows like load_trajectories().
+
+    The evaluation numbers are every evaluation at which some run's best fitness went up.
+    """
+    fitness_histories = {}
+
+    with open(file_path, 'r') as file:
+        lines = file.read().split('\n')
+
+    for index, line in enumerate(lines[:-1]):
+        split_line = lines[index + 1].split('\t')
+
+        if line.startswith('Run ') and line[4:].isdigit() and len(split_line) == 2 and all(value.isdigit() for value in split_line):
+            fitness_histories.setdefault(int(line[4:]), []).append([int(value) for value in split_line])
+
+    if not fitness_histories:
+        raise ValueError(file_path + ' holds no fitness records')
+
+    evals = np.unique([eval_count for history in fitness_histories.values() for eval_count, fitness in history])
+    runs = np.zeros((len(fitness_histories), len(evals)), dtype=np.int64)
+
+    for row, run in enumerate(sorted(fitness_histories)):
+        # Best fitness reached by each evaluation
+        history = np.array(fitness_histories[run])
+        positions = np.searchsorted(history[:, 0], evals, side='right') - 1
+        runs[row] = np.where(positions >= 0, history[positions, 1], 0)
+
+    return evals, runs
+
+
+def get_graph_file_path(file_path):
+    """Returns the file the graph of file_path is saved to: file_path with its ending replaced by '_graph.png'."""
+    for suffix in GRAPH_FILE_SUFFIXES:
+        if file_path.endswith(suffix):
+            return file_path[:-len(suffix)] + '_graph.png'
+
+    return os.path.splitext(file_path)[0] + '_graph.png'
+
+
+def get_sample_columns(num_columns, max_points):
+    """Returns the columns to plot: at most max_points evenly spaced ones, always including the last."""
+    step = max(1, -(-num_columns // max_points))
+    columns = np.arange(0, num_columns, step)
+
+    if columns[-1] != num_columns - 1:
+        columns = np.append(columns, num_columns - 1)
+
+    return columns
+
+
+def aggregate_runs(runs, percentiles):
+    """Returns the mean, minimum, maximum and the given percentiles (a list) of runs at each evaluation.
+
+    runs is an array with one row per run; every statistic is taken down its columns in one go.
+    """
+    runs = np.asarray(runs, dtype=np.float64)
+    return runs.mean(axis=0), runs.min(axis=0), runs.max(axis=0), np.percentile(runs, percentiles, axis=0)
+
+
+def plot_trajectories(file_path, title, max_points, percentiles, subtitle=None):
+    """Plots the mean, min-max band and percentile band of every run in the trajectory file at file_path.
+
+    file_path may also be a text log file (see read_text_trajectories()). The graph is saved next to
+    it (see get_graph_file_path()). The title's second line is subtitle, or the number of runs if
+    it is not given.
+    """
+    if file_path.endswith('.npy'):
+        evals, runs = load_trajectories(file_path)
+
+    else:
+        evals, runs = read_text_trajectories(file_path)
+
+    columns = get_sample_columns(len(evals), max_points)
+
+    # Only the plotted columns are read from the memory-mapped file
+    evals = np.asarray(evals[columns])
+    mean, minimum, maximum, bands = aggregate_runs(runs[:, columns], percentiles)
 
-            elif line_count == 2:
-                # Reset the line count
-                line_count = -1
-    
     # Graph evaluations vs. fitness
-    plt.plot(eval_list, fitness_list, '-ro', linewidth = 2.0)
+    plt.fill_between(evals, minimum, maximum, step='post', color='r', alpha=0.15, linewidth=0, label='min - max')
+    plt.fill_between(evals, bands[0], bands[1], step='post', color='r', alpha=0.3, linewidth=0, label='%gth - %gth percentile' % tuple(percentiles))
+    plt.step(evals, mean, where='post', color='r', linewidth=2.0, label='mean')
 
     # Set axis display parameters
-    plt.xticks(np.arange(0, max(eval_list) + 500, soln_scales[index]))
-    plt.yticks(np.arange(0, max(fitness_list) + 10, 10))
-    plt.xlim(0, eval_list[-1] + (len(eval_list) * 20))
+    plt.xlim(0, evals[-1])
+    plt.ylim(0, maximum.max() + 10)
 
     # Include necessary labels
     plt.xlabel('evaluations')
-    plt.ylabel('fitness')
-    plt.title('Evaluations vs. Fitness for ' + soln_data_titles[index] + '\n(without enforcing black cell number constraint)')
-    plt.annotate('Maximum fitness: ' + str(fitness_list[-1]) + '\nEvaluation number: ' + str(eval_list[-1]), xy = (eval_list[-1], fitness_list[-1]),
-        xytext=(1, -60), ha='right', textcoords='offset points', arrowprops=dict(arrowstyle = 'simple', shrinkA = 0))
+    plt.ylabel('best fitness')
+    plt.title('Evaluations vs. Fitness for ' + title + '\n(' + (subtitle if subtitle else '%i runs' % len(runs)) + ')')
+    plt.legend(loc='lower right')
 
     # Save and close the plot
-    plt.savefig(file_name[:file_name.find('data')] + 'graph.png')
+    plt.savefig(get_graph_file_path(file_path))
     plt.close()
+
+    print('%s\t%i runs\tmean best fitness: %.2f\tmax best fitness: %i' % (file_path, len(runs), mean[-1], maximum[-1]))
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Graphs the best fitness of every run in fitness trajectory files.')
+    parser.add_argument('trajectory_files', nargs='*', help='trajectory files (.npy) or text log files written by main.py (default: the scraped *_soln_data.txt files)')
+    parser.add_argument('--titles', nargs='+', help='graph title for each trajectory file (default: the file name)')
+    parser.add_argument('--max-points', type=int, default=2000, help='most evaluations plotted per graph (default: 2000)')
+    parser.add_argument('--percentiles', type=float, nargs=2, default=[25, 75], metavar=('LOW', 'HIGH'), help='percentile band to shade (default: 25 75)')
+    args = parser.parse_args()
+
+    if not args.trajectory_files:
+        script_dir_path = os.path.dirname(os.path.abspath(__file__))
+
+        for file_name, title in zip(SOLN_DATA_FILES, SOLN_DATA_TITLES):
+            plot_trajectories(os.path.join(script_dir_path, file_name), title, args.max_points, args.percentiles, SOLN_DATA_SUBTITLE)
+
+    for index, file_path in enumerate(args.trajectory_files):
+        title = args.titles[index] if args.titles and index < len(args.titles) else os.path.basename(file_path)
+        plot_trajectories(file_path, title, args.max_points, args.percentiles)
@@ -2,41 +2,110 @@ import json
 import time
 import random
 import coordinate as coord_class
+import light_up_puzzle_binary as binary
+import light_up_puzzle_bitboard as bitboard_class
+import light_up_puzzle_board as board_class
+import light_up_puzzle_propagation as propagation
 
 
-class LightUpPuzzle:
-  def __init__(self, config):
-    """Initializes the light up puzzle class."""
+def read_puzzle_file(file_path, adj_value_dont_care):
+  """Reads the puzzle in file_path and returns its board (a LightUpPuzzleBoard without bulbs).
 
-    def generate_coord_boards():
-      """Generates a 2D coordinate board and its transpose.
-      
-      These are used when verifying solutions and creating random boards.
-      """
-      self.coord_board = []
+  The file may be in the text format or the binary format (see light_up_puzzle_binary.py); binary
+  files are recognized by their first bytes.
+  """
+  if binary.is_binary_puzzle_file(file_path):
+    return binary.read_binary_puzzle_file(file_path, adj_value_dont_care)
 
-      for x in range(self.num_rows):
-        coord_list = []
-        for y in range(self.num_cols):
-          coord_list.append(coord_class.Coordinate(x, y))
+  with open(file_path, 'r') as input_file:
+    # Read line 0 (number of columns)
+    num_cols = int(input_file.readline())
 
-        self.coord_board.append(coord_list)
-      
-      self.transpose_coord_board = [list(l) for l in zip(*self.coord_board)]
+    # Read line 1 (number of rows)
+    num_rows = int(input_file.readline())
 
+    cells = bytearray([board_class.WHITE_SQUARE]) * (num_rows * num_cols)
 
-    def generate_random_board():
-      """Randomly generates a solvable board.
+    # Read line 2 to eof (coordinates of black squares and their adjacency values)
+    for row in input_file:
+      black_square_data = [int(i) for i in row.split()]
+      cells[(black_square_data[1] - 1) * num_cols + black_square_data[0] - 1] = black_square_data[2]
 
-      Solvable boards are generated by iteratively placing black squares (with probability
-      dictated by the configuration file) and required bulbs around each square before
-      removing the bulbs, leaving a board with at least one solution.
+  return board_class.LightUpPuzzleBoard(num_rows, num_cols, adj_value_dont_care, cells)
 
-      This function should only be called in __init__
-      """
-      self.black_squares = {}
-      self.bulbs = set([])
 
+def write_puzzle_file(file_path, board):
+  """Writes the black squares of board (a LightUpPuzzleBoard) to file_path in the text puzzle format."""
+  with open(file_path, 'w') as output_file:
+    output_file.write(str(board.num_cols) + '\n' + str(board.num_rows) + '\n')
+
+    # Squares are listed in column-major order, counting from 1
+    for col in range(board.num_cols):
+      for cell in range(col, board.num_cells, board.num_cols):
+        if board.cells[cell] != board_class.WHITE_SQUARE:
+          output_file.write(str(col + 1) + ' ' + str(cell // board.num_cols + 1) + ' ' + str(board.cells[cell]) + '\n')
+
+
+def read_soln_file(file_path, adj_value_dont_care):
+  """Reads the solution file in file_path and returns its board (a LightUpPuzzleBoard), bulbs included."""
+  with open(file_path, 'r') as soln_file:
+    lines = [line.split() for line in soln_file if line.strip()]
+
+  num_cols = int(lines[0][0])
+  num_rows = int(lines[1][0])
+  cells = bytearray([board_class.WHITE_SQUARE]) * (num_rows * num_cols)
+  line_count = 2
+
+  # Black squares run up to the fitness line
+  while len(lines[line_count]) == 3:
+    col, row, value = [int(i) for i in lines[line_count]]
+    cells[row * num_cols + col] = value
+    line_count += 1
+
+  board = board_class.LightUpPuzzleBoard(num_rows, num_cols, adj_value_dont_care, cells)
+
+  for line in lines[line_count + 1:]:
+    board.place_bulb(int(line[1]) * num_cols + int(line[0]))
+
+  return board
+
+
+def is_soln_file(file_path):
+  """Returns True if the text file at file_path is a solution file rather than a puzzle file (it has a fitness line)."""
+  with open(file_path, 'r') as input_file:
+    return any(len(line.split()) == 1 for line in list(input_file)[2:])
+
+
+def get_soln_str(board, fitness):
+  """Returns board (a LightUpPuzzleBoard) with fitness fitness in the solution file format."""
+  soln_str = str(board.num_cols) + '\n' + str(board.num_rows) + '\n'
+
+  # Squares are listed in column-major order
+  for col in range(board.num_cols):
+    for cell in range(col, board.num_cells, board.num_cols):
+      if board.cells[cell] != board_class.WHITE_SQUARE:
+        soln_str += str(col) + ' ' + str(cell // board.num_cols) + ' ' + str(board.cells[cell]) + '\n'
+
+  soln_str += str(fitness) + '\n'
+
+  for col in range(board.num_cols):
+    for cell in range(col, board.num_cells, board.num_cols):
+      if board.bulb_mask[cell]:
+        soln_str += str(col) + ' ' + str(cell // board.num_cols) + '\n'
+
+  return soln_str + '\n'
+
+
+class LightUpPuzzle:
+  def __init__(self, config, seed_val=None, board=None, board_index=None):
+    """Initializes the light up puzzle class, seeding its random number generator with seed_val.
+
+    The puzzle plays on a copy of board if given, and otherwise generates or reads one. A generated board that
+    is a rotation or reflection of one in board_index (see light_up_puzzle_symmetry.py) is thrown away.
+    """
+
+    def choose_board_dimensions(rng):
+      """Sets the dimensions of a randomly generated board, drawing them from rng if not overridden."""
       if self.config.settings["override_random_board_dimensions"]:
         self.num_rows = self.config.settings["override_num_rows"]
         self.num_cols = self.config.settings["override_num_cols"]
@@ -45,74 +114,153 @@ class LightUpPuzzle:
         min_dimension = self.config.settings["min_random_board_dimension"]
         max_dimension = self.config.settings["max_random_board_dimension"]
 
-        self.num_rows = random.randint(min_dimension, max_dimension)
-        self.num_cols = random.randint(min_dimension, max_dimension)
+        self.num_rows = rng.randint(min_dimension, max_dimension)
+        self.num_cols = rng.randint(min_dimension, max_dimension)
+
 
-      generate_coord_boards()
+    def generate_random_board(rng):
+      """Randomly generates a solvable board using random number generator rng.
+
+      Solvable boards are generated by iteratively placing black squares (with probability
+      dictated by the configuration file) and required bulbs around each square before
+      removing the bulbs, leaving a board with at least one solution.
 
-      # Create a list of shuffled coordinates used in assigning black squares
-      shuffled_coords = []
-      for row in self.coord_board:
-        for coord in row:
-          shuffled_coords.append(coord)
+      This function should only be called in __init__
+      """
+      choose_board_dimensions(rng)
+      self.board = board_class.LightUpPuzzleBoard(self.num_rows, self.num_cols, self.config.settings["adj_value_dont_care"])
 
-      random.shuffle(shuffled_coords)
+      # Create a list of shuffled cells used in assigning black squares
+      shuffled_cells = list(range(self.board.num_cells))
+      rng.shuffle(shuffled_cells)
 
       # Assign black squares to the board
-      for coord in shuffled_coords:
-        if not coord in self.bulbs and random.random() <= self.config.settings["black_square_placement_prob"]:
-          adj_coord_list = self.get_adj_coords(coord)
+      for cell in shuffled_cells:
+        if not self.board.bulb_mask[cell] and rng.random() <= self.config.settings["black_square_placement_prob"]:
+          adj_cell_list = self.board.get_adj_cells(cell)
           num_placed_bulbs = 0
 
           # Compute the random max value for this black square
-          max_value = random.choices(list(range(0, self.config.settings["adj_value_dont_care"])), self.config.settings["black_square_value_probabilities"])[0]
+          max_value = rng.choices(list(range(0, self.config.settings["adj_value_dont_care"])), self.config.settings["black_square_value_probabilities"])[0]
 
           # Put a placeholder black square to ensure the maximum amount of bulbs can be placed
-          self.black_squares[coord] = self.config.settings["adj_value_dont_care"]
+          self.board.place_black_square(cell, self.config.settings["adj_value_dont_care"])
 
           # Place bulbs around the square, if allowed
-          for adj_coord in adj_coord_list:
-            if num_placed_bulbs < max_value and self.place_bulb(adj_coord):
+          for adj_cell in adj_cell_list:
+            if num_placed_bulbs < max_value and self.board.place_bulb(adj_cell):
               num_placed_bulbs += 1
 
           # Update the real black square value to match the number of adjacent bulbs
-          self.black_squares[coord] = num_placed_bulbs
+          self.board.place_black_square(cell, num_placed_bulbs)
         
       if not self.check_completely_solved():
-        # Fill non-lit coordinates with black squares of value self.config.settings["adj_value_dont_care"]
-        for coord in shuffled_coords:
-          if not coord in self.shined_squares and not coord in self.bulbs and not coord in self.black_squares:
-            self.black_squares[coord] = self.config.settings["adj_value_dont_care"]
-      
+        # Fill non-lit cells with black squares of value self.config.settings["adj_value_dont_care"]
+        for cell in shuffled_cells:
+          if not self.board.light_counts[cell] and self.board.cells[cell] == board_class.WHITE_SQUARE:
+            self.board.place_black_square(cell, self.config.settings["adj_value_dont_care"])
+
+
+    def generate_linear_board(rng):
+      """Generates a solvable board in a single pass over the board using random number generator rng.
+
+      All black squares are drawn first (with probability dictated by the configuration file) and
+      indexed once. Each black square then gets up to a random number of adjacent bulbs, and a bulb
+      is put on every square that is still unlit. Bulbs only ever go on unlit squares, so none of
+      them shine on eachother and every white square ends up lit. Finally each black square's value
+      is set to its number of adjacent bulbs, so the bulbs form a complete solution by construction.
+
+      This function should only be called in __init__
+      """
+      choose_board_dimensions(rng)
+      num_cells = self.num_rows * self.num_cols
+      dont_care = self.config.settings["adj_value_dont_care"]
+      cells = bytearray([board_class.WHITE_SQUARE]) * num_cells
+
+      for cell in range(num_cells):
+        if rng.random() <= self.config.settings["black_square_placement_prob"]:
+          cells[cell] = dont_care
+
+      self.board = board_class.LightUpPuzzleBoard(self.num_rows, self.num_cols, dont_care, cells)
+      black_cells = self.board.get_black_cells()
+      max_values = rng.choices(list(range(0, dont_care)), self.config.settings["black_square_value_probabilities"], k=len(black_cells))
+
+      # Place bulbs around the black squares, if allowed
+      for cell, max_value in zip(black_cells, max_values):
+        num_placed_bulbs = 0
+
+        for adj_cell in self.board.get_adj_cells(cell):
+          if num_placed_bulbs < max_value and self.board.place_bulb(adj_cell):
+            num_placed_bulbs += 1
+
+      # Light the remaining squares
+      while self.board.placeable_cells:
+        self.board.place_bulb(self.board.placeable_cells[rng.randrange(len(self.board.placeable_cells))])
+
+      # Set the real black square values to match the number of adjacent bulbs
+      for cell in black_cells:
+        self.board.place_black_square(cell, self.board.adj_bulb_counts[cell])
+
 
-    self.black_squares = {}
-    self.bulbs = set([])
     self.log_str = ''
 
     self.config = config
+    self.bitboard = None # Generation scores boards with the running counters
+    self.num_generation_attempts = 0
+    self.generator_time = 0.0 # Time spent generating boards, excluding their solvability checks
 
     # Seed the random number generator
     self.log_str += 'seed: '
-    if self.config.settings["use_external_seed"]:
-      # Use external seed
-      seed_val = self.config.settings["seed"]
+    if seed_val is None:
+      if self.config.settings["use_external_seed"]:
+        # Use external seed
+        seed_val = self.config.settings["seed"]
 
-    else:
-      # Default to system time as seed
-      seed_val = time.time()
+      else:
+        # Default to system time as seed
+        seed_val = time.time()
     
     random.seed(seed_val)
     self.log_str += str(seed_val) + '\n\n'
 
-    if self.config.settings["generate_board"]:
+    if not board is None:
+      # Reuse the board read by the caller
+      self.log_str += 'puzzle source: ' + self.config.settings["input_file_path"] + '\n\n'
+      self.board = board.copy()
+      self.num_rows = self.board.num_rows
+      self.num_cols = self.board.num_cols
+
+    elif self.config.settings["generate_board"]:
+      if self.config.settings["use_board_seed"]:
+        # Generate the board from its own seed, independent of the run's seed
+        rng = random.Random(self.config.settings["board_seed"])
+
+      else:
+        rng = random
+
+      if self.config.settings["board_generator"] == 'linear':
+        generate_board = generate_linear_board
+
+      else:
+        generate_board = generate_random_board
+
       # Generate random initial board state
-      generate_random_board()
+      generation_start_time = time.time()
+      num_generation_attempts = 0
+
+      while num_generation_attempts == 0 or self.board.num_black_squares == self.board.num_cells or not self.check_completely_solved() or (not board_index is None and not board_index.add(self.board)):
+        if num_generation_attempts == self.config.settings["max_board_generation_attempts"]:
+          raise RuntimeError('no solvable board was generated in %i attempts' % num_generation_attempts)
 
-      while len(self.black_squares) == (self.num_cols * self.num_rows) or not self.check_completely_solved():
-        generate_random_board()
+        attempt_start_time = time.perf_counter()
+        generate_board(rng)
+        self.generator_time += time.perf_counter() - attempt_start_time
+        num_generation_attempts += 1
       
-      # Re-initialize the bulb set
-      self.bulbs = set([])
+      # Remove the bulbs used to generate the board
+      self.clear_board()
+      generation_time = time.time() - generation_start_time
+      self.num_generation_attempts = num_generation_attempts
 
       self.log_str += 'randomly generated puzzle\n' + \
                       '\tmin_random_board_dimension: ' + str(self.config.settings["min_random_board_dimension"]) + '\n' + \
@@ -121,61 +269,69 @@ class LightUpPuzzle:
                       '\toverride_num_rows: ' + str(self.config.settings["override_num_rows"]) + '\n' + \
                       '\toverride_num_cols: ' + str(self.config.settings["override_num_cols"]) + '\n' + \
                       '\tblack_square_value_probabilities: ' + str(self.config.settings["black_square_value_probabilities"]) + '\n' + \
-                      '\tblack_square_placement_prob: ' + str(self.config.settings["black_square_placement_prob"]) + '\n\n'
+                      '\tblack_square_placement_prob: ' + str(self.config.settings["black_square_placement_prob"]) + '\n' + \
+                      '\tboard_generator: ' + self.config.settings["board_generator"] + '\n' + \
+                      '\tboard_seed: ' + (str(self.config.settings["board_seed"]) if self.config.settings["use_board_seed"] else 'None') + '\n' + \
+                      '\tgeneration attempts: ' + str(num_generation_attempts) + '\n' + \
+                      '\tgeneration time: ' + ('%.6f' % generation_time) + ' seconds\n\n'
 
     else:
       # Read initial board state
-      with open(self.config.settings["input_file_path"], 'r') as input_file:
-        self.log_str += 'puzzle source: ' + self.config.settings["input_file_path"] + '\n\n'
-
-        # Read line 0 (number of columns)
-        self.num_cols = int(input_file.readline())
-
-        # Read line 1 (number of rows)
-        self.num_rows = int(input_file.readline())
-
-        # Read line 2 to eof (coordinates of black squares and their adjacency values)
-        for row in input_file:
-          black_square_data = [int(i) for i in row.split()]
-          self.black_squares[coord_class.Coordinate(black_square_data[1] - 1, black_square_data[0] - 1)] = black_square_data[2]
-        
-      # Generate coordinate versions of the board
-      generate_coord_boards()
+      self.log_str += 'puzzle source: ' + self.config.settings["input_file_path"] + '\n\n'
+      self.board = read_puzzle_file(self.config.settings["input_file_path"], self.config.settings["adj_value_dont_care"])
+      self.num_rows = self.board.num_rows
+      self.num_cols = self.board.num_cols
       
 
     self.log_str += 'board size (#cols x #rows): ' + str(self.num_cols) + ' x ' + str(self.num_rows) + '\n' + \
                     'enforce_adj_quotas: ' + ('True' if self.config.settings["enforce_adj_quotas"] else 'False') + '\n' + \
                     'adj_value_dont_care: ' + str(self.config.settings["adj_value_dont_care"]) + '\n' + \
-                    'max_num_random_bulb_placements: ' + str(self.config.settings["max_num_random_bulb_placements"]) + '\n\n'
+                    'max_num_random_bulb_placements: ' + str(self.config.settings["max_num_random_bulb_placements"]) + '\n' + \
+                    'use_candidate_pool: ' + ('True' if self.config.settings["use_candidate_pool"] else 'False') + '\n' + \
+                    'fitness_backend: ' + self.config.settings["fitness_backend"] + '\n' + \
+                    'use_constraint_propagation: ' + ('True' if self.config.settings["use_constraint_propagation"] else 'False') + '\n\n'
 
-    with open(config.settings["log_file_path"], 'a') as log:
-      log.write(self.log_str)
+    if self.config.settings["use_constraint_propagation"]:
+      # Fix the bulbs and empty squares forced by the puzzle before searching
+      num_forced_bulbs, num_forbidden_cells, is_consistent = propagation.propagate_constraints(self.board, self.config.settings["enforce_adj_quotas"])
+
+      self.log_str += 'constraint propagation\n' + \
+                      '\tforced bulbs: ' + str(num_forced_bulbs) + '\n' + \
+                      '\tforbidden squares: ' + str(num_forbidden_cells) + '\n' + \
+                      '\tundecided squares: ' + str(len(self.board.placeable_cells)) + '\n' + \
+                      ('' if is_consistent else '\tthe puzzle has no complete solution\n') + '\n'
 
     self.num_empty_squares = -1 # This value is updated during solution verification
+    self.batch_evaluator = None # Created on the first call to evaluate_batch()
+
+    if self.config.settings["fitness_backend"] != 'counters':
+      # Only cross-checking still reads the board's quota counters
+      self.bitboard = bitboard_class.LightUpPuzzleBitBoard(self.board, self.config.settings["enforce_adj_quotas"], self.config.settings["fitness_backend"] == 'cross_check')
+
+
+  def get_cell(self, coord):
+    """Returns the cell index of coordinate coord."""
+    return coord.x * self.num_cols + coord.y
+
+
+  def get_coord(self, cell):
+    """Returns the coordinate of cell index cell."""
+    return coord_class.Coordinate(cell // self.num_cols, cell % self.num_cols)
 
 
   def get_random_coord(self):
     """Returns a random coordinate ranging in the space (num_cols, num_rows)."""
     return coord_class.Coordinate(random.randint(0, self.num_rows - 1), random.randint(0, self.num_cols - 1))
+
+
+  def get_random_cell(self):
+    """Returns a random cell index, drawn the same way as get_random_coord()."""
+    return random.randint(0, self.num_rows - 1) * self.num_cols + random.randint(0, self.num_cols - 1)
   
 
   def get_adj_coords(self, coord):
     """Returns a list of coordinates adjacent to coordinate coord"""
-    adj_coords = []
-
-    if not coord.x == 0:
-      adj_coords.append(coord_class.Coordinate(coord.x - 1, coord.y))
-
-    if not coord.x == self.num_rows - 1:
-      adj_coords.append(coord_class.Coordinate(coord.x + 1, coord.y))
-    
-    if not coord.y == 0:
-      adj_coords.append(coord_class.Coordinate(coord.x, coord.y - 1))
-    
-    if not coord.y == self.num_cols - 1:
-      adj_coords.append(coord_class.Coordinate(coord.x, coord.y + 1))
-    
-    return adj_coords
+    return [self.get_coord(cell) for cell in self.board.get_adj_cells(self.get_cell(coord))]
 
 
   def place_bulb(self, coord):
@@ -183,51 +339,15 @@ class LightUpPuzzle:
 
     Returns True on success, False on fail.
     """
-    if coord in self.black_squares:
-      return False # Can't place a bulb on a black square 
-
-    # Check for cross-shine in the coordinate's row (same x value)
-    matching_x_coord_bulbs = [c for c in self.bulbs if c.x == coord.x]
-    found_x_delimeter = False if len(matching_x_coord_bulbs) else True
-
-    for bulb_coord in matching_x_coord_bulbs:
-      if bulb_coord.x == coord.x:
-        min_y = min(bulb_coord.y, coord.y)
-        max_y = max(bulb_coord.y, coord.y)
-
-        if max_y - min_y < 2:
-          return False
-        
-        for black_coord in [c for c in self.black_squares if c.x == coord.x]:
-          if black_coord.y < max_y and black_coord.y > min_y:
-            found_x_delimeter = True
-            break
-
-    if not found_x_delimeter:
-      return False
-      
-    # Check for cross-shine in the coordinate's column (same y value)
-    matching_y_coord_bulbs = [c for c in self.bulbs if c.y == coord.y]
-    found_y_delimeter = False if len(matching_y_coord_bulbs) else True
+    return self.board.place_bulb(self.get_cell(coord))
 
-    for bulb_coord in matching_y_coord_bulbs:
-      if bulb_coord.y == coord.y:
-        min_x = min(bulb_coord.x, coord.x)
-        max_x = max(bulb_coord.x, coord.x)
 
-        if max_x - min_x < 2:
-          return False
-        
-        for black_coord in [c for c in self.black_squares if c.y == coord.y]:
-          if black_coord.x < max_x and black_coord.x > min_x:
-            found_y_delimeter = True
-            break
-    
-    if not found_y_delimeter:
-      return False
+  def remove_bulb(self, coord):
+    """Attempts to remove the bulb at coord position on the board.
 
-    self.bulbs.add(coord)
-    return True
+    Returns True on success, False if there is no bulb at coord.
+    """
+    return self.board.remove_bulb(self.get_cell(coord))
     
 
   def visualize(self):
@@ -237,43 +357,20 @@ class LightUpPuzzle:
     'x' Black square (with 0 <= x <= self.config.settings["adj_value_dont_care"])
     '!' Light bulb
     """
-    board = [ [ '_' for col in range(self.num_cols) ] for row in range(self.num_rows) ]
+    for row in range(self.num_rows):
+      for cell in range(row * self.num_cols, (row + 1) * self.num_cols):
+        if self.board.bulb_mask[cell]:
+          item = '!'
+        elif self.board.cells[cell] != board_class.WHITE_SQUARE:
+          item = str(self.board.cells[cell])
+        else:
+          item = '_'
 
-    for coord, value in self.black_squares.items():
-      board[coord.x][coord.y] = str(value)
-    
-    for coord in self.bulbs:
-      board[coord.x][coord.y] = '!'
-    
-    for row in board:
-      for item in row:
         print(item + ' ', end='')
 
       print()
 
     print()
-
-  
-  def get_num_bulbs(self, coord_list):
-    """Returns the number of bulbs in coord_list"""
-    num_adj_bulbs = 0
-
-    for coord in coord_list:
-      if coord in self.bulbs:
-        num_adj_bulbs += 1
-    
-    return num_adj_bulbs
-   
-
-  def get_num_black_squares(self, coord_list):
-    """Returns the number of black squares in coord_list"""
-    num_adj_black_squares = 0  
-
-    for coord in coord_list:
-      if coord in self.black_squares:
-        num_adj_black_squares += 1
-    
-    return num_adj_black_squares 
     
 
   def check_completely_solved(self):
@@ -284,48 +381,24 @@ class LightUpPuzzle:
       2. No bulbs shine on eachother. (guaranteed by place_bulb() function)
       3. Every black square has the required adjacent bulbs. (can be disabled using config file setting)
     """
-    # Create and populate set of shined squares
-    self.shined_squares = set([])
-
-    if len(self.bulbs) == 0:
+    if self.board.num_bulbs == 0:
       return False
 
-    for bulb_coord in self.bulbs:
-      # Create a list of adjacency lists - used for determining where the bulb shines
-      adj_coord_lists = []
-
-      adj_coord_lists.append(self.coord_board[bulb_coord.x][:bulb_coord.y][::-1])           # Row from this column to the left
-      adj_coord_lists.append(self.coord_board[bulb_coord.x][bulb_coord.y + 1:])             # Row from this column to the right
-      adj_coord_lists.append(self.transpose_coord_board[bulb_coord.y][:bulb_coord.x][::-1]) # Column from this row up
-      adj_coord_lists.append(self.transpose_coord_board[bulb_coord.y][bulb_coord.x + 1:])   # Column from this row down
+    if self.bitboard:
+      # Score the board once for both checks
+      fitness, is_valid = self.evaluate_bitboard()[:2]
+      self.num_empty_squares = self.board.num_cells - (fitness + self.board.num_black_squares)
 
-      for coord_list in adj_coord_lists:
-        for coord in coord_list:
-          if coord in self.black_squares:
-            break # Shine cannot propagate any further
-          elif coord in self.bulbs:
-            return False # Redundant check for bulb on bulb shining
-          else:
-            self.shined_squares.add(coord)
-
-    # Ensure bulbs count as shined squares
-    for bulb_coord in self.bulbs:
-      self.shined_squares.add(bulb_coord)
+      return self.num_empty_squares == 0 and is_valid
 
     # Verify all squares are accounted for
-    if (len(self.black_squares) + len(self.shined_squares)) != (self.num_cols * self.num_rows):
-      self.num_empty_squares = (self.num_cols * self.num_rows) - (len(self.shined_squares) + len(self.black_squares) + len(self.bulbs))
-      return False
+    self.num_empty_squares = self.board.num_cells - (self.get_fitness() + self.board.num_black_squares)
 
-    self.num_empty_squares = 0
+    if self.num_empty_squares:
+      return False
 
     # Check black square conditions
-    if self.config.settings["enforce_adj_quotas"]:
-      for coord, adj_value in self.black_squares.items():
-        if adj_value < self.config.settings["adj_value_dont_care"] and self.get_num_bulbs(self.get_adj_coords(coord)) != adj_value:
-          return False
-
-    return True
+    return self.check_valid_solution()
 
 
   def check_valid_solution(self):
@@ -335,51 +408,79 @@ class LightUpPuzzle:
       1. No bulbs shine on eachother. (guaranteed by place_bulb() function)
       2. Every black square has the required adjacent bulbs. (can be disabled using config file setting)
     """
-    # Create and populate set of shined squares
-    self.shined_squares = set([])
-
-    for bulb_coord in self.bulbs:
-      # Create a list of adjacency lists - used for determining where the bulb shines
-      adj_coord_lists = []
-
-      adj_coord_lists.append(self.coord_board[bulb_coord.x][:bulb_coord.y][::-1])           # Row from this column to the left
-      adj_coord_lists.append(self.coord_board[bulb_coord.x][bulb_coord.y + 1:])             # Row from this column to the right
-      adj_coord_lists.append(self.transpose_coord_board[bulb_coord.y][:bulb_coord.x][::-1]) # Column from this row up
-      adj_coord_lists.append(self.transpose_coord_board[bulb_coord.y][bulb_coord.x + 1:])   # Column from this row down
-
-      for coord_list in adj_coord_lists:
-        for coord in coord_list:
-          if coord in self.black_squares:
-            break # Shine cannot propagate any further
-          elif coord in self.bulbs:
-            return False # Redundant check for bulb on bulb shining
-          else:
-            self.shined_squares.add(coord)
-    
-    # Ensure bulbs count as shined squares
-    for bulb_coord in self.bulbs:
-      self.shined_squares.add(bulb_coord)
+    if self.bitboard:
+      return self.evaluate_bitboard()[1]
 
-    # Check black square conditions
     if self.config.settings["enforce_adj_quotas"]:
-      for coord, adj_value in self.black_squares.items():
-        if adj_value < self.config.settings["adj_value_dont_care"] and self.get_num_bulbs(self.get_adj_coords(coord)) != adj_value:
-          return False
+      return self.board.num_quota_violations == 0
     
     return True
+
+
+  def score(self):
+    """Returns a tuple (valid, fitness): check_valid_solution() and, if the board is valid, get_fitness() (0 otherwise)."""
+    if self.bitboard and self.config.settings["fitness_backend"] == 'bitboard':
+      return self.bitboard.score()
+
+    is_valid = self.check_valid_solution()
+    return (is_valid, self.get_fitness() if is_valid else 0)
+
+
+  def evaluate_bitboard(self):
+    """Scores the board with the bitboard backend (see light_up_puzzle_bitboard.py).
+
+    With fitness_backend set to 'cross_check', the result is compared with the board's running
+    counters and a RuntimeError is raised if they disagree.
+    Returns (fitness, valid, conflicts, quota_violations).
+    """
+    result = self.bitboard.evaluate()
+
+    if self.config.settings["fitness_backend"] == 'cross_check':
+      is_valid = self.board.num_quota_violations == 0 if self.config.settings["enforce_adj_quotas"] else True
+      expected = (self.board.num_lit_squares, is_valid, 0, self.board.num_quota_violations)
+
+      if result != expected:
+        raise RuntimeError('Bitboard result ' + str(result) + ' does not match counter result ' + str(expected) + ' for bulbs ' + str(self.board.get_bulb_cells()))
+
+    return result
+    
+
+  def evaluate_batch(self, layouts):
+    """Scores a batch of N bulb layouts for this board in one vectorized pass.
+
+    layouts is an N x (num_rows * num_cols) boolean array of bulb positions, indexed by cell. Bulbs
+    currently on the board are ignored. Requires NumPy.
+
+    Returns (fitness, valid, conflicts, quota_violations) arrays; see
+    light_up_puzzle_batch.LightUpPuzzleBatchEvaluator.evaluate().
+    """
+    if self.batch_evaluator is None:
+      import light_up_puzzle_batch as batch_class
+      self.batch_evaluator = batch_class.LightUpPuzzleBatchEvaluator(self.board, self.config.settings["enforce_adj_quotas"])
+
+    return self.batch_evaluator.evaluate(layouts)
     
 
   def place_bulb_randomly(self):
     """Attempts to put a bulb randomly on the board in a valid location.
 
-    Stops trying to put a bulb after max_num_random_bulb_placements tries.
+    If use_candidate_pool is set, the bulb is placed on a square drawn uniformly from the squares
+    where a bulb can currently be placed, so this only fails when no bulb can be placed at all.
+    Otherwise random squares are tried, stopping after max_num_random_bulb_placements tries.
+    Squares forbidden by constraint propagation are never used.
     Returns True if successful, False otherwise.
     """
-    coord = self.get_random_coord()
+    if self.config.settings["use_candidate_pool"]:
+      if not self.board.placeable_cells:
+        return False
+
+      return self.board.place_bulb(self.board.placeable_cells[random.randrange(len(self.board.placeable_cells))])
+
+    cell = self.get_random_cell()
     count = 0
 
-    while count < self.config.settings["max_num_random_bulb_placements"] and not self.place_bulb(coord):
-      coord = self.get_random_coord()
+    while count < self.config.settings["max_num_random_bulb_placements"] and (self.board.forbidden_mask[cell] or not self.board.place_bulb(cell)):
+      cell = self.get_random_cell()
       count += 1
     
     if count < self.config.settings["max_num_random_bulb_placements"]:
@@ -388,21 +489,15 @@ class LightUpPuzzle:
     return False
   
   
+  def get_soln_str(self):
+    """Returns problem information in the solution file format."""
+    return get_soln_str(self.board, self.get_fitness())
+
+
   def write_to_soln_file(self):
     """Writes problem information to the solution file specified in the configuration file."""
     with open(self.config.settings["soln_file_path"], 'w') as soln_file:
-      soln_file.write(str(self.num_cols) + '\n')
-      soln_file.write(str(self.num_rows) + '\n')
-
-      for coord in sorted(self.black_squares):
-        soln_file.write(str(coord.y) + ' ' + str(coord.x) + ' ' + str(self.black_squares[coord]) + '\n')
-      
-      soln_file.write(str(len(self.shined_squares)) + '\n')
-
-      for coord in sorted(self.bulbs):
-        soln_file.write(str(coord.y) + ' ' + str(coord.x) + '\n')
-      
-      soln_file.write('\n')
+      soln_file.write(self.get_soln_str())
 
 
   def get_fitness(self):
@@ -410,9 +505,12 @@ class LightUpPuzzle:
 
     Fitness is defined as the number of lit squares on the board.
     """
-    return len(self.shined_squares)
+    if self.bitboard:
+      return self.evaluate_bitboard()[0]
+
+    return self.board.num_lit_squares
   
 
   def clear_board(self):
-    """Clears all bulbs from the board."""
-    self.bulbs = set([])
\ No newline at end of file
+    """Clears all bulbs from the board, except those locked in by constraint propagation."""
+    self.board.clear_bulbs()
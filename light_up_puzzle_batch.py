@@ -0,0 +1,96 @@
+import numpy as np
+import light_up_puzzle_board as board_class
+
+
+class LightUpPuzzleBatchEvaluator:
+  def __init__(self, board, enforce_adj_quotas):
+    """Initializes the batch evaluator class.
+
+    Precomputes the segment and adjacency structure of board (a LightUpPuzzleBoard) so that many
+    bulb layouts for it can be scored with a handful of NumPy operations. Bulbs on board are ignored.
+
+    Segments are stored as index arrays rather than dense cell x segment matrices: row segments are
+    contiguous in row-major order and column segments in column-major order, so the bulbs in every
+    segment are summed at once with np.add.reduceat.
+    """
+    self.num_cells = board.num_cells
+    self.enforce_adj_quotas = enforce_adj_quotas
+
+    cells = np.frombuffer(bytes(board.cells), dtype=np.uint8)
+    self.black_mask = cells != board_class.WHITE_SQUARE
+
+    # White squares in row-major and column-major order
+    self.row_order = np.flatnonzero(~self.black_mask)
+    self.col_order = np.flatnonzero(~self.black_mask.reshape(board.num_rows, board.num_cols).T.ravel())
+    self.col_order = (self.col_order % board.num_rows) * board.num_cols + self.col_order // board.num_rows
+
+    # Position of each segment's first square within the orders above, and the segment of each
+    # white square (in row-major order)
+    row_segments = np.array(board.row_segments, dtype=np.int64)
+    col_segments = np.array(board.col_segments, dtype=np.int64)
+
+    self.row_starts = np.flatnonzero(np.diff(row_segments[self.row_order], prepend=-2))
+    self.col_starts = np.flatnonzero(np.diff(col_segments[self.col_order], prepend=-2))
+
+    self.row_segment_of_cell = np.searchsorted(row_segments[self.row_order][self.row_starts], row_segments[self.row_order])
+    col_segment_ids = col_segments[self.col_order][self.col_starts]
+    col_sort = np.argsort(col_segment_ids)
+    self.col_segment_of_cell = col_sort[np.searchsorted(col_segment_ids[col_sort], col_segments[self.row_order])]
+
+    # Neighbours of every black square with an adjacency quota (num_cells marks "no neighbour")
+    dont_care = board.adj_value_dont_care
+    quota_cells = [cell for cell in board.get_black_cells() if board.cells[cell] < dont_care]
+    self.quota_values = np.array([board.cells[cell] for cell in quota_cells], dtype=np.int64)
+    self.quota_neighbours = np.full((4, len(quota_cells)), self.num_cells, dtype=np.int64)
+
+    for index, cell in enumerate(quota_cells):
+      for direction, adj_cell in enumerate(board.get_adj_cells(cell)):
+        self.quota_neighbours[direction][index] = adj_cell
+
+
+  def evaluate(self, layouts):
+    """Scores a batch of bulb layouts.
+
+    layouts is an N x num_cells boolean array (or anything convertible to one) where layouts[i][cell]
+    is True if layout i has a bulb at cell.
+
+    Returns a tuple of four length N arrays:
+      fitness           Number of lit squares (bulbs on black squares light nothing)
+      valid             True if the layout passes check_valid_solution(): no bulbs on black squares,
+                        no bulbs shining on eachother and, if enforce_adj_quotas is set, no quota
+                        violations
+      conflicts         Number of pairs of bulbs shining on eachother
+      quota_violations  Number of black squares whose adjacency value is not met
+    """
+    layouts = np.asarray(layouts, dtype=bool).reshape(-1, self.num_cells)
+    num_layouts = layouts.shape[0]
+
+    white_bulbs = layouts[:, self.row_order].astype(np.int32)
+    bulbs_on_black = np.count_nonzero(layouts[:, self.black_mask], axis=1)
+
+    if len(self.row_order):
+      row_counts = np.add.reduceat(white_bulbs, self.row_starts, axis=1)
+      col_counts = np.add.reduceat(layouts[:, self.col_order].astype(np.int32), self.col_starts, axis=1)
+
+      lit = (row_counts[:, self.row_segment_of_cell] > 0) | (col_counts[:, self.col_segment_of_cell] > 0)
+      fitness = np.count_nonzero(lit, axis=1)
+      conflicts = ((row_counts * (row_counts - 1)) // 2).sum(axis=1) + ((col_counts * (col_counts - 1)) // 2).sum(axis=1)
+
+    else:
+      fitness = np.zeros(num_layouts, dtype=np.int64)
+      conflicts = np.zeros(num_layouts, dtype=np.int64)
+
+    padded_layouts = np.concatenate([layouts, np.zeros((num_layouts, 1), dtype=bool)], axis=1)
+    adj_bulb_counts = np.zeros((num_layouts, len(self.quota_values)), dtype=np.int64)
+
+    for neighbours in self.quota_neighbours:
+      adj_bulb_counts += padded_layouts[:, neighbours]
+
+    quota_violations = np.count_nonzero(adj_bulb_counts != self.quota_values, axis=1)
+
+    valid = (conflicts == 0) & (bulbs_on_black == 0)
+
+    if self.enforce_adj_quotas:
+      valid &= quota_violations == 0
+
+    return fitness, valid, conflicts, quota_violations
@@ -0,0 +1,64 @@
+import mmap
+import struct
+import light_up_puzzle_board as board_class
+
+
+# A binary puzzle file is a header (magic bytes, number of rows, number of columns) followed by one
+# byte per square in row-major order, the same values as LightUpPuzzleBoard.cells. A square holding
+# a bulb (only in files converted from solution files) is stored as BULB_SQUARE.
+MAGIC = b'LUPB'
+HEADER = struct.Struct('<4sII')
+BULB_SQUARE = 0xFE
+
+
+def is_binary_puzzle_file(file_path):
+  """Returns True if the file at file_path starts with the binary puzzle file magic bytes."""
+  with open(file_path, 'rb') as puzzle_file:
+    return puzzle_file.read(len(MAGIC)) == MAGIC
+
+
+def read_binary_puzzle_file(file_path, adj_value_dont_care):
+  """Reads the binary puzzle file at file_path and returns its board (a LightUpPuzzleBoard).
+
+  The file is memory-mapped and the board's cells are a read-only view of it, so the board (and
+  every copy of it) keeps no copy of its own of the cell grid. Building the board's indexes still
+  makes temporary copies of the grid while they are built. If the file holds bulbs, the cells are
+  copied instead and the bulbs placed on the board.
+  """
+  with open(file_path, 'rb') as puzzle_file:
+    file_map = mmap.mmap(puzzle_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+  magic, num_rows, num_cols = HEADER.unpack_from(file_map)
+
+  if magic != MAGIC or len(file_map) != HEADER.size + num_rows * num_cols:
+    raise ValueError(file_path + ' is not a valid binary puzzle file')
+
+  cells = memoryview(file_map)[HEADER.size:]
+
+  if file_map.find(bytes([BULB_SQUARE]), HEADER.size) == -1:
+    return board_class.LightUpPuzzleBoard(num_rows, num_cols, adj_value_dont_care, cells)
+
+  cells = bytearray(cells)
+  bulb_cells = [cell for cell in range(len(cells)) if cells[cell] == BULB_SQUARE]
+
+  for cell in bulb_cells:
+    cells[cell] = board_class.WHITE_SQUARE
+
+  board = board_class.LightUpPuzzleBoard(num_rows, num_cols, adj_value_dont_care, cells)
+
+  for cell in bulb_cells:
+    board.place_bulb(cell)
+
+  return board
+
+
+def write_binary_puzzle_file(file_path, board):
+  """Writes board (a LightUpPuzzleBoard) to file_path in the binary puzzle file format, bulbs included."""
+  cells = bytearray(board.cells)
+
+  for cell in board.get_bulb_cells():
+    cells[cell] = BULB_SQUARE
+
+  with open(file_path, 'wb') as puzzle_file:
+    puzzle_file.write(HEADER.pack(MAGIC, board.num_rows, board.num_cols))
+    puzzle_file.write(cells)
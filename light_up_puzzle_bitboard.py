@@ -0,0 +1,174 @@
+import light_up_puzzle_board as board_class
+
+
+def get_cell_bits(bits):
+  """Returns a list of the cell indices set in the bitset bits."""
+  cells = []
+
+  while bits:
+    low_bit = bits & -bits
+    cells.append(low_bit.bit_length() - 1)
+    bits ^= low_bit
+
+  return cells
+
+
+def get_board_masks(board, include_quotas=True):
+  """Returns the bitsets describing board (a LightUpPuzzleBoard), bit cell standing for the square at index cell.
+
+  Returns a tuple (white_mask, light_masks, quotas):
+    white_mask   Every white square
+    light_masks  For each white square, its row segment and column segment (the squares a bulb there
+                 lights); 0 for black squares
+    quotas       A (neighbour bitset, adjacency value) pair for each black square with an adjacency
+                 quota (empty if include_quotas is not set)
+  """
+  white_mask = 0
+  light_masks = [0] * board.num_cells
+  quotas = []
+  segment_masks = {}
+
+  for cell in range(board.num_cells):
+    if board.cells[cell] == board_class.WHITE_SQUARE:
+      white_mask |= 1 << cell
+
+      for segment_id in [board.row_segments[cell], board.col_segments[cell]]:
+        if not segment_id in segment_masks:
+          segment_masks[segment_id] = sum(1 << segment_cell for segment_cell in board.get_segment_cells(segment_id))
+
+        light_masks[cell] |= segment_masks[segment_id]
+
+    elif include_quotas and board.cells[cell] < board.adj_value_dont_care:
+      quotas.append((sum(1 << adj_cell for adj_cell in board.get_adj_cells(cell)), board.cells[cell]))
+
+  return (white_mask, light_masks, quotas)
+
+
+class LightUpPuzzleBitBoard:
+  def __init__(self, board, enforce_adj_quotas, keep_adj_counts=False):
+    """Initializes the bitboard class.
+
+    Scores the bulbs on board (a LightUpPuzzleBoard) with Python int bitsets, bit cell standing for
+    the square at index cell, instead of reading the board's running counters. The board keeps its
+    bulbs and lit squares as bitsets from then on, and its adjacent bulb counts only if
+    keep_adj_counts is set (see LightUpPuzzleBoard.enable_bulb_bits()).
+
+    self.quota_mask holds the black squares needing 0 to 4 adjacent bulbs and self.quota_value_bits
+    bits 0-2 of their adjacency values, so quotas are checked with one popcount (see
+    get_quota_mismatches()).
+    """
+    self.board = board
+    self.enforce_adj_quotas = enforce_adj_quotas
+
+    white_mask, self.light_masks = get_board_masks(board, include_quotas=False)[:2]
+    all_mask = (1 << board.num_cells) - 1
+    self.black_mask = all_mask & ~white_mask
+
+    # Squares with a square to their left or right (in the same row)
+    first_col_mask = sum(1 << cell for cell in range(0, board.num_cells, board.num_cols))
+    self.has_left_mask = all_mask & ~first_col_mask
+    self.has_right_mask = all_mask & ~(first_col_mask << (board.num_cols - 1))
+
+    # Black squares with a quota, and the number that can never have enough adjacent bulbs
+    self.quota_mask = 0
+    self.quota_value_bits = [0, 0, 0]
+    self.num_unmet_quotas = 0
+
+    for cell in board.get_black_cells():
+      value = board.cells[cell]
+
+      if value >= board.adj_value_dont_care:
+        continue
+
+      if value > 4:
+        self.num_unmet_quotas += 1
+        continue
+
+      self.quota_mask |= 1 << cell
+
+      for bit in range(len(self.quota_value_bits)):
+        if value >> bit & 1:
+          self.quota_value_bits[bit] |= 1 << cell
+
+    board.enable_bulb_bits(keep_adj_counts)
+
+
+  def get_quota_mismatches(self, bulbs, first_only=False):
+    """Returns the bitset of black squares with an adjacency value of 0 to 4 that the bitset of bulbs bulbs does not meet.
+
+    The adjacent bulb counts of every square are added up at once, as three bitsets holding bits 0-2
+    of the count, from the bulbs shifted by a row (above and below) and a column (left and right).
+    A quota is not met where any of them differs from the adjacency value. If first_only is set, the
+    bitset is returned as soon as one of them is found to differ, so it may be missing squares.
+    """
+    num_cols = self.board.num_cols
+    above = bulbs << num_cols
+    below = bulbs >> num_cols
+    left = (bulbs << 1) & self.has_left_mask
+    right = (bulbs >> 1) & self.has_right_mask
+
+    # Add the four 1-bit counts: pairwise, then the two 2-bit sums
+    vertical_sum = above ^ below
+    horizontal_sum = left ^ right
+    value_bits = self.quota_value_bits
+    mismatches = (vertical_sum ^ horizontal_sum ^ value_bits[0]) & self.quota_mask
+
+    if first_only and mismatches:
+      return mismatches
+
+    vertical_carry = above & below
+    horizontal_carry = left & right
+    sum_carry = vertical_sum & horizontal_sum
+    mismatches |= ((vertical_carry ^ horizontal_carry ^ sum_carry ^ value_bits[1]) | ((vertical_carry & horizontal_carry) ^ value_bits[2])) & self.quota_mask
+
+    return mismatches
+
+
+  def score(self):
+    """Returns a tuple (valid, fitness) for the bulbs on the board, fitness being 0 if they are not valid.
+
+    Checking quotas stops at the first one found not met, so invalid boards cost less than with
+    evaluate().
+    """
+    if self.enforce_adj_quotas and (self.num_unmet_quotas or self.get_quota_mismatches(self.board.bulb_bits, True)):
+      return (False, 0)
+
+    return (True, (self.board.row_lit_bits | self.board.col_lit_bits).bit_count())
+
+
+  def evaluate(self, bulbs=None):
+    """Scores the bitset of bulbs bulbs (the bulbs on the board if not given).
+
+    Returns a tuple (fitness, valid, conflicts, quota_violations), as
+    LightUpPuzzleBatchEvaluator.evaluate() does for a single layout:
+      fitness           Number of lit squares (bulbs on black squares light nothing)
+      valid             True if there are no bulbs on black squares, no bulbs shining on eachother
+                        and, if enforce_adj_quotas is set, no quota violations
+      conflicts         Number of pairs of bulbs shining on eachother
+      quota_violations  Number of black squares whose adjacency value is not met
+    """
+    if bulbs is None:
+      # The board's bitsets are up to date, and its bulbs never shine on eachother
+      bulbs = self.board.bulb_bits
+      lit = self.board.row_lit_bits | self.board.col_lit_bits
+      conflicts = 0
+
+    else:
+      lit = 0
+      num_shared = 0
+
+      for cell in get_cell_bits(bulbs & ~self.black_mask):
+        light_mask = self.light_masks[cell]
+        lit |= light_mask
+        num_shared += (bulbs & light_mask).bit_count() - 1
+
+      # Each conflicting pair was counted once by each of its bulbs
+      conflicts = num_shared // 2
+
+    quota_violations = self.num_unmet_quotas + self.get_quota_mismatches(bulbs).bit_count()
+    valid = conflicts == 0 and not bulbs & self.black_mask
+
+    if self.enforce_adj_quotas:
+      valid = valid and quota_violations == 0
+
+    return (lit.bit_count(), valid, conflicts, quota_violations)
@@ -0,0 +1,428 @@
+import array
+import itertools
+import random
+
+
+WHITE_SQUARE = 0xFF # Cell value of a non-black square
+
+# Translation tables mapping black squares to 0 (white squares stay WHITE_SQUARE), and black squares
+# to 1 and white squares to 0, respectively
+WHITE_SQUARES_ONLY = bytes(WHITE_SQUARE) + bytes([WHITE_SQUARE])
+BLACK_SQUARES_ONLY = bytes([1]) * WHITE_SQUARE + bytes(1)
+
+
+class LightUpPuzzleBoard:
+  def __init__(self, num_rows, num_cols, adj_value_dont_care, cells=None):
+    """Initializes the light up puzzle board class.
+
+    The board is stored as flat arrays indexed by row * num_cols + col. cells may be any bytes-like
+    object holding the cell values (no black squares if not given); a read-only memoryview, such as a
+    memory-mapped puzzle file, is shared by copies of the board and can't have black squares placed.
+    """
+    self.num_rows = num_rows
+    self.num_cols = num_cols
+    self.num_cells = num_rows * num_cols
+    self.adj_value_dont_care = adj_value_dont_care
+
+    # WHITE_SQUARE, or the adjacency value of the black square
+    if cells is None:
+      self.cells = bytearray([WHITE_SQUARE]) * self.num_cells
+    else:
+      self.cells = cells
+
+    self.bulb_mask = bytearray(self.num_cells)
+    self.forbidden_mask = bytearray(self.num_cells) # Squares constraint propagation keeps bulbs off
+    self.locked_mask = bytearray(self.num_cells) # Bulbs constraint propagation keeps on the board
+    self.light_counts = bytearray(self.num_cells) # Number of occupied segments through each square
+    self.adj_bulb_counts = bytearray(self.num_cells)
+
+    # A segment is a maximal run of white squares in a row (or column). A bulb lights exactly its row
+    # and column segments, so two bulbs shine on eachother if and only if they share a segment. Row
+    # segment IDs are the index of their first square, column segment IDs num_cells plus that index.
+    self.row_segments = array.array('i', [-1]) * self.num_cells
+    self.col_segments = array.array('i', [-1]) * self.num_cells
+    self.segment_lengths = array.array('i', [0]) * (2 * self.num_cells)
+    self.occupied_segments = bytearray(2 * self.num_cells)
+
+    self.num_bulbs = 0
+    self.num_lit_squares = 0
+    self.num_quota_violations = 0
+
+    # Bulb hashes, kept once enable_bulb_hashing() has been called
+    self.zobrist_keys = None
+    self.bulb_hash = 0
+    self.symmetry_keys = []
+    self.symmetry_hashes = []
+
+    # Bitsets, kept once enable_bulb_bits() has been called
+    self.keep_adj_counts = True
+    self.segment_bits = None
+    self.bulb_bits = 0
+    self.row_lit_bits = 0
+    self.col_lit_bits = 0
+
+    # Every unlit, non-forbidden white square (where place_bulb() succeeds) in no particular order,
+    # and each square's position in the list (-1 if not placeable) so it is updated in constant time
+    cell_values = bytes(self.cells)
+    self.placeable_cells = list(itertools.compress(range(self.num_cells), cell_values.translate(WHITE_SQUARES_ONLY)))
+    self.placeable_positions = array.array('i', [-1]) * self.num_cells
+
+    for position, cell in enumerate(self.placeable_cells):
+      self.placeable_positions[cell] = position
+
+    self.num_black_squares = self.num_cells - len(self.placeable_cells)
+
+    for row in range(self.num_rows):
+      self.index_row_segments(row)
+
+    for col in range(self.num_cols):
+      self.index_col_segments(col)
+
+    # With no bulbs on the board, exactly the quotas above 0 are violated
+    for value in range(1, self.adj_value_dont_care):
+      self.num_quota_violations += cell_values.count(value)
+
+
+  def copy(self):
+    """Returns a copy of the board, bulbs included."""
+    board = LightUpPuzzleBoard.__new__(LightUpPuzzleBoard)
+    board.__dict__.update(self.__dict__)
+
+    for name in ['bulb_mask', 'forbidden_mask', 'locked_mask', 'light_counts', 'adj_bulb_counts', 'row_segments', 'col_segments', 'segment_lengths', 'occupied_segments', 'placeable_cells', 'placeable_positions', 'symmetry_hashes']:
+      setattr(board, name, getattr(self, name)[:])
+
+    if not isinstance(self.cells, memoryview):
+      board.cells = bytearray(self.cells)
+
+    return board
+
+
+  def enable_bulb_hashing(self, seed=0, symmetries=()):
+    """Starts keeping self.bulb_hash, the XOR of a random 64-bit key for each square holding a bulb.
+
+    The keys are drawn from their own generator seeded with seed, so the random module is left alone.
+
+    symmetries may list symmetries of the board (see light_up_puzzle_symmetry.get_board_symmetries()),
+    each giving the square every square is mapped to. A hash of the mapped bulbs is then kept for
+    each of them too, so get_canonical_bulb_hash() is the same for bulb layouts that are rotations or
+    reflections of eachother.
+    """
+    rng = random.Random(seed)
+    self.zobrist_keys = [rng.getrandbits(64) for cell in range(self.num_cells)]
+    self.symmetry_keys = [[self.zobrist_keys[target] for target in targets] for targets in symmetries]
+    self.bulb_hash = 0
+    self.symmetry_hashes = [0] * len(self.symmetry_keys)
+
+    for cell in self.get_bulb_cells():
+      self.bulb_hash ^= self.zobrist_keys[cell]
+
+      for index, keys in enumerate(self.symmetry_keys):
+        self.symmetry_hashes[index] ^= keys[cell]
+
+
+  def get_canonical_bulb_hash(self):
+    """Returns the smallest of the bulb hashes (self.bulb_hash and self.symmetry_hashes)."""
+    if self.symmetry_hashes:
+      return min(self.bulb_hash, min(self.symmetry_hashes))
+
+    return self.bulb_hash
+
+
+  def enable_bulb_bits(self, keep_adj_counts=True):
+    """Starts keeping the bulbs and lit squares as bitsets, bit cell standing for the square at index cell.
+
+    self.bulb_bits holds the bulbs, and self.row_lit_bits and self.col_lit_bits the squares lit by
+    the bulbs' row and column segments, updated as bulbs are placed and removed. Unless
+    keep_adj_counts is set, self.adj_bulb_counts and self.num_quota_violations stop being updated.
+    """
+    self.keep_adj_counts = keep_adj_counts
+    self.segment_bits = [0] * (2 * self.num_cells)
+
+    for segment_id in range(2 * self.num_cells):
+      if self.segment_lengths[segment_id]:
+        self.segment_bits[segment_id] = sum(1 << cell for cell in self.get_segment_cells(segment_id))
+
+    self.bulb_bits = 0
+    self.row_lit_bits = 0
+    self.col_lit_bits = 0
+
+    for cell in self.get_bulb_cells():
+      self.bulb_bits |= 1 << cell
+      self.row_lit_bits |= self.segment_bits[self.row_segments[cell]]
+      self.col_lit_bits |= self.segment_bits[self.col_segments[cell]]
+
+
+  def index_line_segments(self, first_cell, length, stride, segments, id_offset):
+    """(Re)assigns segment IDs to the length squares starting at first_cell, stride squares apart.
+
+    segments is the array (self.row_segments or self.col_segments) receiving the IDs and id_offset
+    is added to every segment ID. There must be no bulbs in the line.
+    """
+    line = slice(first_cell, first_cell + (length - 1) * stride + 1, stride)
+    segments[line] = array.array('i', [-1]) * length
+    self.segment_lengths[id_offset + line.start:id_offset + line.stop:stride] = array.array('i', [0]) * length
+
+    # Each segment is a run of white squares between black squares (mapped to 0)
+    position = 0
+
+    for run in bytes(self.cells[line]).translate(WHITE_SQUARES_ONLY).split(b'\x00'):
+      if run:
+        segment_id = id_offset + first_cell + position * stride
+        segments[first_cell + position * stride:first_cell + (position + len(run) - 1) * stride + 1:stride] = array.array('i', [segment_id]) * len(run)
+        self.segment_lengths[segment_id] = len(run)
+
+      position += len(run) + 1
+
+
+  def index_row_segments(self, row):
+    """(Re)assigns segment IDs to every square in row."""
+    self.index_line_segments(row * self.num_cols, self.num_cols, 1, self.row_segments, 0)
+
+
+  def index_col_segments(self, col):
+    """(Re)assigns segment IDs to every square in column col."""
+    self.index_line_segments(col, self.num_rows, self.num_cols, self.col_segments, self.num_cells)
+
+
+  def get_segment_cells(self, segment_id):
+    """Returns a range over the squares in the segment with ID segment_id."""
+    if segment_id < self.num_cells:
+      return range(segment_id, segment_id + self.segment_lengths[segment_id])
+
+    first_cell = segment_id - self.num_cells
+    return range(first_cell, first_cell + self.segment_lengths[segment_id] * self.num_cols, self.num_cols)
+
+
+  def get_adj_cells(self, cell):
+    """Returns a list of the squares adjacent to cell (above, below, left, right)."""
+    adj_cells = []
+    col = cell % self.num_cols
+
+    if cell >= self.num_cols:
+      adj_cells.append(cell - self.num_cols)
+
+    if cell < self.num_cells - self.num_cols:
+      adj_cells.append(cell + self.num_cols)
+
+    if col != 0:
+      adj_cells.append(cell - 1)
+
+    if col != self.num_cols - 1:
+      adj_cells.append(cell + 1)
+
+    return adj_cells
+
+
+  def get_bulb_cells(self):
+    """Returns a list of the squares holding bulbs, in row-major order."""
+    bulb_cells = []
+    cell = self.bulb_mask.find(1)
+
+    while cell != -1:
+      bulb_cells.append(cell)
+      cell = self.bulb_mask.find(1, cell + 1)
+
+    return bulb_cells
+
+
+  def get_black_cells(self):
+    """Returns a list of the black squares, in row-major order."""
+    return list(itertools.compress(range(self.num_cells), bytes(self.cells).translate(BLACK_SQUARES_ONLY)))
+
+
+  def is_quota_violated(self, cell):
+    """Returns True if the black square at cell does not have its required adjacent bulbs."""
+    value = self.cells[cell]
+    return value < self.adj_value_dont_care and self.adj_bulb_counts[cell] != value
+
+
+  def add_placeable_cell(self, cell):
+    """Adds cell to the pool of placeable squares."""
+    self.placeable_positions[cell] = len(self.placeable_cells)
+    self.placeable_cells.append(cell)
+
+
+  def remove_placeable_cell(self, cell):
+    """Removes cell from the pool of placeable squares by swapping the last pool entry into its place."""
+    position = self.placeable_positions[cell]
+    last_cell = self.placeable_cells.pop()
+
+    if last_cell != cell:
+      self.placeable_cells[position] = last_cell
+      self.placeable_positions[last_cell] = position
+
+    self.placeable_positions[cell] = -1
+
+
+  def place_black_square(self, cell, value):
+    """Places a black square with adjacency value value at cell, keeping the segment index up to date.
+
+    Bulbs must not be placed on cell.
+    """
+    if self.cells[cell] != WHITE_SQUARE:
+      # Only the adjacency value changes
+      self.num_quota_violations -= self.is_quota_violated(cell)
+      self.cells[cell] = value
+      self.num_quota_violations += self.is_quota_violated(cell)
+      return
+
+    # The new square splits the row and column segments passing through cell. Lift the bulbs
+    # in those segments while they are re-indexed, then put them back
+    lifted_bulbs = [c for c in self.get_segment_cells(self.row_segments[cell]) if self.bulb_mask[c]] + \
+                   [c for c in self.get_segment_cells(self.col_segments[cell]) if self.bulb_mask[c]]
+
+    for bulb_cell in lifted_bulbs:
+      self.remove_bulb(bulb_cell)
+
+    if self.placeable_positions[cell] != -1:
+      self.remove_placeable_cell(cell)
+
+    self.cells[cell] = value
+    self.num_black_squares += 1
+    self.index_row_segments(cell // self.num_cols)
+    self.index_col_segments(cell % self.num_cols)
+    self.num_quota_violations += self.is_quota_violated(cell)
+
+    if self.segment_bits:
+      # The segment bitsets changed with the index
+      self.enable_bulb_bits(self.keep_adj_counts)
+
+    for bulb_cell in lifted_bulbs:
+      self.place_bulb(bulb_cell)
+
+
+  def shine_segment(self, segment_id, amount):
+    """Adds amount to the light count of every square in the segment with ID segment_id."""
+    light_counts = self.light_counts
+
+    for cell in self.get_segment_cells(segment_id):
+      old_count = light_counts[cell]
+      light_counts[cell] = old_count + amount
+
+      if old_count == 0:
+        self.num_lit_squares += 1
+
+        if not self.forbidden_mask[cell]:
+          self.remove_placeable_cell(cell)
+      elif old_count + amount == 0:
+        self.num_lit_squares -= 1
+
+        if not self.forbidden_mask[cell]:
+          self.add_placeable_cell(cell)
+
+
+  def count_adj_bulb(self, cell, amount):
+    """Adds amount to the adjacent bulb count of every square next to cell."""
+    for adj_cell in self.get_adj_cells(cell):
+      if self.cells[adj_cell] != WHITE_SQUARE:
+        self.num_quota_violations -= self.is_quota_violated(adj_cell)
+        self.adj_bulb_counts[adj_cell] += amount
+        self.num_quota_violations += self.is_quota_violated(adj_cell)
+
+      else:
+        self.adj_bulb_counts[adj_cell] += amount
+
+
+  def place_bulb(self, cell):
+    """Attempts to place a bulb at cell.
+
+    Returns True on success, False on fail.
+    """
+    if self.cells[cell] != WHITE_SQUARE:
+      return False # Can't place a bulb on a black square
+
+    # A bulb already in either segment would cross-shine with this one
+    row_segment = self.row_segments[cell]
+    col_segment = self.col_segments[cell]
+
+    if self.occupied_segments[row_segment] or self.occupied_segments[col_segment]:
+      return False
+
+    self.bulb_mask[cell] = 1
+    self.num_bulbs += 1
+
+    if self.zobrist_keys:
+      self.bulb_hash ^= self.zobrist_keys[cell]
+
+      for index, keys in enumerate(self.symmetry_keys):
+        self.symmetry_hashes[index] ^= keys[cell]
+
+    if self.segment_bits:
+      self.bulb_bits |= 1 << cell
+      self.row_lit_bits |= self.segment_bits[row_segment]
+      self.col_lit_bits |= self.segment_bits[col_segment]
+
+    self.occupied_segments[row_segment] = 1
+    self.occupied_segments[col_segment] = 1
+
+    self.shine_segment(row_segment, 1)
+    self.shine_segment(col_segment, 1)
+
+    if self.keep_adj_counts:
+      self.count_adj_bulb(cell, 1)
+
+    return True
+
+
+  def remove_bulb(self, cell):
+    """Attempts to remove the bulb at cell.
+
+    Returns True on success, False if there is no bulb at cell or the bulb is locked.
+    """
+    if not self.bulb_mask[cell] or self.locked_mask[cell]:
+      return False
+
+    row_segment = self.row_segments[cell]
+    col_segment = self.col_segments[cell]
+
+    self.bulb_mask[cell] = 0
+    self.num_bulbs -= 1
+
+    if self.zobrist_keys:
+      self.bulb_hash ^= self.zobrist_keys[cell]
+
+      for index, keys in enumerate(self.symmetry_keys):
+        self.symmetry_hashes[index] ^= keys[cell]
+
+    if self.segment_bits:
+      # No other bulb lights these segments
+      self.bulb_bits ^= 1 << cell
+      self.row_lit_bits ^= self.segment_bits[row_segment]
+      self.col_lit_bits ^= self.segment_bits[col_segment]
+
+    self.occupied_segments[row_segment] = 0
+    self.occupied_segments[col_segment] = 0
+
+    self.shine_segment(row_segment, -1)
+    self.shine_segment(col_segment, -1)
+
+    if self.keep_adj_counts:
+      self.count_adj_bulb(cell, -1)
+
+    return True
+
+
+  def forbid_cell(self, cell):
+    """Marks cell as a square that must not hold a bulb, taking it out of the placeable pool."""
+    self.forbidden_mask[cell] = 1
+
+    if self.placeable_positions[cell] != -1:
+      self.remove_placeable_cell(cell)
+
+
+  def lock_bulb(self, cell):
+    """Attempts to place a bulb at cell that can't be removed afterwards.
+
+    Returns True on success, False on fail.
+    """
+    if not self.place_bulb(cell):
+      return False
+
+    self.locked_mask[cell] = 1
+    return True
+
+
+  def clear_bulbs(self):
+    """Removes every bulb that is not locked from the board."""
+    for cell in self.get_bulb_cells():
+      self.remove_bulb(cell)
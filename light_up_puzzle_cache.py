@@ -0,0 +1,72 @@
+import collections
+import sys
+
+
+class LightUpPuzzleEvalCache:
+  def __init__(self, max_entries):
+    """Initializes the evaluation cache class.
+
+    The cache maps a board's bulb hash (see LightUpPuzzleBoard.enable_bulb_hashing()) to the
+    (validity, fitness) pair of that bulb layout, the fitness being 0 for an invalid layout (invalid
+    layouts are never scored). It holds at most max_entries layouts, evicting the least recently
+    used one when full.
+    """
+    self.max_entries = max_entries
+    self.entries = collections.OrderedDict()
+
+    self.num_lookups = 0
+    self.num_hits = 0
+    self.num_evictions = 0
+
+
+  def get(self, bulb_hash):
+    """Returns the (validity, fitness) pair stored for bulb_hash, or None if it is not in the cache."""
+    self.num_lookups += 1
+    entry = self.entries.get(bulb_hash)
+
+    if not entry is None:
+      self.entries.move_to_end(bulb_hash)
+      self.num_hits += 1
+
+    return entry
+
+
+  def put(self, bulb_hash, is_valid, fitness):
+    """Stores the validity and fitness of the layout with hash bulb_hash."""
+    self.entries[bulb_hash] = (is_valid, fitness)
+
+    if len(self.entries) > self.max_entries:
+      self.entries.popitem(last=False)
+      self.num_evictions += 1
+
+
+  def get_memory_size(self):
+    """Returns the approximate number of bytes used by the cache's entries."""
+    size = sys.getsizeof(self.entries)
+
+    for bulb_hash, entry in self.entries.items():
+      size += sys.getsizeof(bulb_hash) + sys.getsizeof(entry)
+
+    return size
+
+
+  def get_state(self):
+    """Returns the cache contents (least recently used first) and statistics in a form that can be written as JSON."""
+    return {'entries': [[bulb_hash, is_valid, fitness] for bulb_hash, (is_valid, fitness) in self.entries.items()],
+            'num_lookups': self.num_lookups, 'num_hits': self.num_hits, 'num_evictions': self.num_evictions}
+
+
+  def set_state(self, state):
+    """Restores cache contents and statistics returned by get_state()."""
+    self.entries = collections.OrderedDict((bulb_hash, (is_valid, fitness)) for bulb_hash, is_valid, fitness in state['entries'])
+    self.num_lookups = state['num_lookups']
+    self.num_hits = state['num_hits']
+    self.num_evictions = state['num_evictions']
+
+
+  def get_summary_fields(self):
+    """Returns the cache statistics as fields for LightUpPuzzleLog.record_summary()."""
+    hit_rate = self.num_hits / self.num_lookups if self.num_lookups else 0.0
+
+    return [('lookups', self.num_lookups), ('hits', self.num_hits), ('hit rate', hit_rate, '{:.2%}'),
+            ('entries', len(self.entries)), ('evictions', self.num_evictions), ('memory', self.get_memory_size(), '{} bytes')]
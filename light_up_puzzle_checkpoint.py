@@ -0,0 +1,119 @@
+import json
+import os
+import random
+
+
+def get_random_state():
+  """Returns the state of the random module in a form that can be written as JSON."""
+  version, internal_state, gauss_next = random.getstate()
+  return [version, list(internal_state), gauss_next]
+
+
+def set_random_state(state):
+  """Restores a state of the random module returned by get_random_state()."""
+  random.setstate((state[0], tuple(state[1]), state[2]))
+
+
+def get_board_state(board):
+  """Returns the squares, bulbs and placeable pool of board (a LightUpPuzzleBoard) in a form that can be written as JSON."""
+  return {'num_rows': board.num_rows, 'num_cols': board.num_cols, 'cells': bytes(board.cells).hex(),
+          'bulbs': board.get_bulb_cells(), 'placeable_cells': list(board.placeable_cells)}
+
+
+def set_board_state(board, state):
+  """Puts the bulbs of a board state returned by get_board_state() on board.
+
+  The placeable pool is restored in its saved order, so random draws from it repeat exactly.
+  Raises a RuntimeError if board does not have the same squares as the saved board.
+  """
+  if board.num_rows != state['num_rows'] or board.num_cols != state['num_cols'] or bytes(board.cells).hex() != state['cells']:
+    raise RuntimeError('The checkpoint board does not match the board of the run being resumed')
+
+  board.clear_bulbs()
+
+  for cell in state['bulbs']:
+    if not board.bulb_mask[cell]:
+      board.place_bulb(cell)
+
+  board.placeable_cells = list(state['placeable_cells'])
+
+  for cell in range(board.num_cells):
+    board.placeable_positions[cell] = -1
+
+  for position, cell in enumerate(board.placeable_cells):
+    board.placeable_positions[cell] = position
+
+
+class LightUpPuzzleCheckpoint:
+  def __init__(self, config):
+    """Initializes the checkpoint class.
+
+    A checkpoint is a JSON file at checkpoint_file_path holding everything needed to continue an
+    experiment where it stopped (self.state):
+      'base_seed'    The seed every run's seed is derived from
+      'run_count'    The first run that has not been written to the log file
+      'log_size'     The size of the log file once that run's predecessors were written
+      'best_result'  The best run result so far (without its log buffer and fitness history), or None
+      'run'          The state of run run_count part way through, or None if it restarts from its
+                     first evaluation (see run_random_search())
+      'board_index'  The state of self.board_index (the index of the boards generated by the runs
+                     before run_count, see light_up_puzzle_symmetry.py), or None if there is none
+
+    The file is rewritten at the end of every run and, within a run, every checkpoint_interval
+    evaluations. It is replaced atomically, so a crash while writing leaves the previous one.
+    """
+    self.file_path = config.settings["checkpoint_file_path"]
+    self.interval = config.settings["checkpoint_interval"]
+    self.state = None
+    self.board_index = None
+
+
+  def start(self, base_seed):
+    """Starts a new checkpoint for an experiment with base seed base_seed."""
+    self.state = {'base_seed': base_seed, 'run_count': 1, 'log_size': 0, 'best_result': None, 'run': None, 'board_index': None}
+
+
+  def load(self):
+    """Reads the checkpoint file."""
+    with open(self.file_path, 'r') as checkpoint_file:
+      self.state = json.load(checkpoint_file)
+
+
+  def save(self):
+    """Writes the checkpoint file."""
+    temp_file_path = self.file_path + '.tmp'
+
+    with open(temp_file_path, 'w') as checkpoint_file:
+      json.dump(self.state, checkpoint_file)
+
+    os.replace(temp_file_path, self.file_path)
+
+
+  def save_run_end(self, run_count, log_size, best_result):
+    """Records that run run_count has been written to the log file, which is now log_size bytes long."""
+    self.state['run_count'] = run_count + 1
+    self.state['log_size'] = log_size
+    self.state['best_result'] = None if best_result is None else dict((key, value) for key, value in best_result.items() if not key in ('log_str', 'fitness_history'))
+    self.state['run'] = None
+    self.state['board_index'] = self.board_index.get_state() if self.board_index else None
+    self.save()
+
+
+  def save_run(self, run_state):
+    """Records the state of the current run part way through (a dictionary with a 'run_count' field)."""
+    self.state['run'] = run_state
+    self.save()
+
+
+  def get_run_state(self, run_count):
+    """Returns the saved state of run run_count, or None if it has none."""
+    if self.state['run'] and self.state['run']['run_count'] == run_count:
+      return self.state['run']
+
+    return None
+
+
+  def remove(self):
+    """Deletes the checkpoint file, once the experiment is done."""
+    if os.path.exists(self.file_path):
+      os.remove(self.file_path)
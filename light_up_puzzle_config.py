@@ -1,12 +1,295 @@
+import copy
+import difflib
 import json
+import os
+import light_up_puzzle_board as board_class
+
+
+# Type of every setting. Flags are ints (0 or 1); floats also accept ints.
+SETTING_TYPES = {
+    # Experiment parameters
+    "num_experiment_runs": int,
+    "num_fitness_evaluations": int,
+    "num_worker_processes": int,
+    "search_engine": str,
+    "enforce_adj_quotas": int,
+
+    # File paths
+    "input_file_path": str,
+    "log_file_path": str,
+    "soln_file_path": str,
+    "checkpoint_file_path": str,
+    "profile_dump_path": str,
+    "trajectory_file_path": str,
+    "batch_output_dir_path": str,
+    "sweep_table_file_path": str,
+
+    # Logging
+    "log_format": str,
+    "log_verbosity": int,
+    "progress_interval": int,
+    "soln_checkpoint_interval": int,
+    "checkpoint_interval": int,
+    "enable_profiling": int,
+    "profile_run": int,
+    "trajectory_interval": int,
+
+    # Board generation
+    "generate_board": int,
+    "use_external_seed": int,
+    "seed": int,
+    "black_square_placement_prob": float,
+    "min_random_board_dimension": int,
+    "max_random_board_dimension": int,
+    "override_random_board_dimensions": int,
+    "override_num_rows": int,
+    "override_num_cols": int,
+    "black_square_value_probabilities": list,
+    "board_generator": str,
+    "use_board_seed": int,
+    "board_seed": int,
+    "max_board_generation_attempts": int,
+    "skip_duplicate_boards": int,
+
+    # Algorithm parameters & constants
+    "adj_value_dont_care": int,
+    "max_num_random_bulb_placements": int,
+    "use_candidate_pool": int,
+    "fitness_backend": str,
+    "eval_cache_size": int,
+    "eval_cache_skip_duplicates": int,
+    "eval_cache_use_symmetries": int,
+    "use_constraint_propagation": int,
+    "exact_solver_node_budget": int,
+    "exact_solver_time_budget": float,
+    "local_search_move_probabilities": list,
+    "local_search_quota_penalty": float,
+    "local_search_initial_temperature": float,
+    "local_search_cooling_rate": float,
+    "local_search_restart_interval": int,
+    "evolution_population_size": int,
+    "evolution_num_generations": int,
+    "evolution_tournament_size": int,
+    "evolution_mutation_rate": float,
+    "evolution_penalty": float,
+}
+
+# Allowed values of the settings that are one of a few choices
+SETTING_CHOICES = {
+    "search_engine": ['random', 'exact', 'local', 'evolution'],
+    "log_format": ['text', 'jsonl'],
+    "log_verbosity": [0, 1, 2],
+    "board_generator": ['classic', 'linear'],
+    "fitness_backend": ['counters', 'bitboard', 'cross_check'],
+}
+
+# Smallest allowed values of numeric settings (any other numeric setting must not be negative)
+SETTING_MINIMUMS = {
+    "num_experiment_runs": 1,
+    "num_worker_processes": 1,
+    "min_random_board_dimension": 1,
+    "max_random_board_dimension": 1,
+    "override_num_rows": 1,
+    "override_num_cols": 1,
+    "max_board_generation_attempts": 1,
+    "adj_value_dont_care": 1,
+    "evolution_population_size": 2,
+    "evolution_num_generations": 1,
+    "evolution_tournament_size": 1,
+}
+
+
+# Default value of every optional setting. A setting in SETTING_TYPES with no default here (and
+# not in DERIVED_FILE_PATH_SUFFIXES) must be given in the config file.
+SETTING_DEFAULTS = {
+    "num_worker_processes": 1,
+    "search_engine": "random",
+    "batch_output_dir_path": "output/batch",
+    "log_format": "text",
+    "log_verbosity": 2,
+    "progress_interval": 1000,
+    "soln_checkpoint_interval": 0,
+    "checkpoint_interval": 0,
+    "enable_profiling": 0,
+    "profile_run": 0,
+    "trajectory_interval": 0,
+    "board_generator": "classic",
+    "use_board_seed": 0,
+    "board_seed": 123456789,
+    "max_board_generation_attempts": 10000,
+    "skip_duplicate_boards": 0,
+    "use_candidate_pool": 0,
+    "fitness_backend": "counters",
+    "eval_cache_size": 0,
+    "eval_cache_skip_duplicates": 0,
+    "eval_cache_use_symmetries": 0,
+    "use_constraint_propagation": 0,
+    "exact_solver_node_budget": 0,
+    "exact_solver_time_budget": 60,
+    "local_search_move_probabilities": [0.5, 0.2, 0.3],
+    "local_search_quota_penalty": 2,
+    "local_search_initial_temperature": 2.0,
+    "local_search_cooling_rate": 0.999,
+    "local_search_restart_interval": 2000,
+    "evolution_population_size": 100,
+    "evolution_num_generations": 100,
+    "evolution_tournament_size": 3,
+    "evolution_mutation_rate": 0.2,
+    "evolution_penalty": 2,
+}
+
+# File paths that default to log_file_path with its "_log.txt" ending (or extension) replaced
+DERIVED_FILE_PATH_SUFFIXES = {
+    "checkpoint_file_path": "_checkpoint.json",
+    "profile_dump_path": "_profile.pstats",
+    "trajectory_file_path": "_trajectory.npy",
+    "sweep_table_file_path": "_sweep.txt",
+}
+
+
+def parse_setting_value(value_str):
+    """Returns the value of a setting given on the command line: JSON if it parses as JSON, otherwise the string itself."""
+    try:
+        return json.loads(value_str)
+
+    except ValueError:
+        return value_str
+
+
+def get_derived_file_path(log_file_path, suffix):
+    """Returns log_file_path with its "_log.txt" ending (or, failing that, its extension) replaced by suffix."""
+    if log_file_path.endswith('_log.txt'):
+        return log_file_path[:-len('_log.txt')] + suffix
+
+    return os.path.splitext(log_file_path)[0] + suffix
 
 
 class LightUpPuzzleConfig:
-    def __init__(self, config_file):
+    def __init__(self, config_file=None, settings=None):
         """Initializes the light up puzzle config class.
 
-        This class assumes JSON format for data in config_file.
+        The settings are read from config_file (in JSON format) or, if it is not given, taken from
+        the dictionary settings. Settings left out are filled in from SETTING_DEFAULTS and
+        DERIVED_FILE_PATH_SUFFIXES, so config files written before a setting was added keep working.
+        The settings are checked against SETTING_TYPES, SETTING_CHOICES and SETTING_MINIMUMS straight
+        away, so a typo'd key or bad value fails before any board is generated. Keys starting with '_'
+        (section headings) are ignored.
+
+        Raises a ValueError describing every problem found.
         """
+        self.source = config_file if config_file else 'settings'
+
+        if config_file:
+            with open(config_file, 'r') as file:
+                settings = json.load(file)
+
+        self.settings = dict(settings)
+        self.derived_keys = set() # Settings filled in from DERIVED_FILE_PATH_SUFFIXES
+        self.validate()
+
+
+    def fill_defaults(self):
+        """Adds the default value of every setting with a default that is not set.
+
+        File paths derived from log_file_path are derived again, so they follow an overridden
+        log_file_path.
+        """
+        for key, default in SETTING_DEFAULTS.items():
+            if not key in self.settings:
+                self.settings[key] = copy.deepcopy(default)
+
+        log_file_path = self.settings.get("log_file_path")
+
+        if isinstance(log_file_path, str):
+            for key, suffix in DERIVED_FILE_PATH_SUFFIXES.items():
+                if not key in self.settings or key in self.derived_keys:
+                    self.settings[key] = get_derived_file_path(log_file_path, suffix)
+                    self.derived_keys.add(key)
+
+
+    def get_errors(self):
+        """Returns a list of the problems with the settings (empty if there are none)."""
+        errors = []
+
+        for key, value in self.settings.items():
+            if key.startswith('_'):
+                continue
+
+            if not key in SETTING_TYPES:
+                suggestions = difflib.get_close_matches(key, SETTING_TYPES.keys(), 1)
+                errors.append("unknown setting '" + key + "'" + (" (did you mean '" + suggestions[0] + "'?)" if suggestions else ''))
+                continue
+
+            value_type = SETTING_TYPES[key]
+            is_number = isinstance(value, (int, float)) and not isinstance(value, bool)
+
+            if value_type is float and is_number:
+                value = float(value)
+
+            elif value_type is int and isinstance(value, bool):
+                value = int(value)
+
+            if not isinstance(value, value_type) or (value_type is list and not all(isinstance(item, (int, float)) for item in value)):
+                errors.append("setting '" + key + "' must be " + ('a list of numbers' if value_type is list else 'of type ' + value_type.__name__) + ', not ' + json.dumps(value))
+
+            elif key in SETTING_CHOICES and not value in SETTING_CHOICES[key]:
+                errors.append("setting '" + key + "' must be one of " + json.dumps(SETTING_CHOICES[key]) + ', not ' + json.dumps(value))
+
+            elif value_type in (int, float) and value < SETTING_MINIMUMS.get(key, 0):
+                errors.append("setting '" + key + "' must be at least " + str(SETTING_MINIMUMS.get(key, 0)) + ', not ' + json.dumps(value))
+
+            else:
+                self.settings[key] = value
+
+        for key in SETTING_TYPES:
+            if not key in self.settings:
+                errors.append("missing setting '" + key + "'")
+
+        if errors:
+            return errors
+
+        # Settings that depend on eachother
+        if self.settings["min_random_board_dimension"] > self.settings["max_random_board_dimension"]:
+            errors.append("setting 'min_random_board_dimension' must not be above 'max_random_board_dimension'")
+
+        if self.settings["adj_value_dont_care"] >= board_class.WHITE_SQUARE:
+            errors.append("setting 'adj_value_dont_care' must be below " + str(board_class.WHITE_SQUARE) + ' (the cell value of white squares)')
+
+        elif len(self.settings["black_square_value_probabilities"]) != self.settings["adj_value_dont_care"]:
+            errors.append("setting 'black_square_value_probabilities' must have an entry for each adjacency value below 'adj_value_dont_care' (" +
+                          str(self.settings["adj_value_dont_care"]) + ' entries)')
+
+        if len(self.settings["local_search_move_probabilities"]) != 3:
+            errors.append("setting 'local_search_move_probabilities' must have 3 entries (add, remove, move)")
+
+        return errors
+
+
+    def validate(self):
+        """Fills in the default settings and checks the settings, raising a ValueError listing every problem found."""
+        self.fill_defaults()
+        errors = self.get_errors()
+
+        if errors:
+            raise ValueError(self.source + ': ' + '; '.join(errors))
+
+
+    def override(self, key, value):
+        """Sets setting key to value and checks the settings again."""
+        self.settings[key] = value
+        self.derived_keys.discard(key)
+        self.validate()
+
+
+    def apply_overrides(self, overrides):
+        """Applies a list of 'key=value' strings (the --set command line option), value being JSON or a plain string."""
+        for override in overrides:
+            key, separator, value_str = override.partition('=')
+
+            if not separator:
+                raise ValueError("override '" + override + "' is not of the form key=value")
+
+            self.settings[key.strip()] = parse_setting_value(value_str.strip())
+            self.derived_keys.discard(key.strip())
 
-        with open(config_file, 'r') as file:
-          self.settings = json.loads(file.read().replace('\n', ''))
+        self.validate()
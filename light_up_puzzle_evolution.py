@@ -0,0 +1,155 @@
+import random
+import numpy as np
+
+
+class LightUpPuzzleEvolution:
+  def __init__(self, puzzle, config):
+    """Initializes the evolutionary search class.
+
+    The population is an evolution_population_size x num_cells boolean array of bulb layouts,
+    starting from random layouts that light as much of the board as place_bulb() allows. Each
+    generation:
+      1. The whole population is scored in one vectorized pass (puzzle.evaluate_batch()), each
+         layout counting as one fitness evaluation
+      2. Parents are picked by tournaments of evolution_tournament_size layouts
+      3. Each child takes a random band of rows from its second parent and the rest from its first
+      4. With probability evolution_mutation_rate, a child is loaded onto the board through
+         place_bulb() (dropping any bulbs shining on eachother), then has a random bulb removed and
+         one put on a random placeable square
+
+    Squares forbidden by constraint propagation are kept clear of bulbs in every layout, as they are
+    kept out of the placeable pool.
+      5. The best layout is carried over unchanged
+
+    Layouts are ranked by their number of lit squares minus evolution_penalty per pair of bulbs
+    shining on eachother and per black square missing its adjacency value (quotas only count if
+    enforce_adj_quotas is set).
+    """
+    self.puzzle = puzzle
+    self.board = puzzle.board
+    self.config = config
+
+    self.population_size = config.settings["evolution_population_size"]
+    self.tournament_size = config.settings["evolution_tournament_size"]
+    self.mutation_rate = config.settings["evolution_mutation_rate"]
+    self.penalty = config.settings["evolution_penalty"]
+    self.enforce_adj_quotas = config.settings["enforce_adj_quotas"]
+
+    # NumPy generator seeded from the random module, so runs with the same seed stay identical
+    self.rng = np.random.default_rng(random.getrandbits(64))
+    self.cell_rows = np.arange(self.board.num_cells) // self.board.num_cols
+    self.forbidden_cells = np.frombuffer(bytes(self.board.forbidden_mask), dtype=np.uint8) != 0
+
+    self.num_generations = 0
+    self.num_mutations = 0
+    self.num_repaired_bulbs = 0
+
+
+  def get_layout(self):
+    """Returns the bulbs on the board as a boolean array indexed by cell."""
+    return np.frombuffer(bytes(self.board.bulb_mask), dtype=np.uint8) != 0
+
+
+  def load_layout(self, layout):
+    """Replaces the (unlocked) bulbs on the board with those of layout, dropping any that place_bulb() rejects or on forbidden squares."""
+    self.board.clear_bulbs()
+
+    for cell in np.flatnonzero(layout).tolist():
+      if not self.board.bulb_mask[cell] and (self.board.forbidden_mask[cell] or not self.board.place_bulb(cell)):
+        self.num_repaired_bulbs += 1
+
+
+  def get_random_layout(self):
+    """Returns a random layout built by placing bulbs on random placeable squares until none are left."""
+    self.board.clear_bulbs()
+
+    while self.board.placeable_cells:
+      self.board.place_bulb(self.board.placeable_cells[self.rng.integers(len(self.board.placeable_cells))])
+
+    return self.get_layout()
+
+
+  def select(self, scores, num_parents):
+    """Returns the indices of num_parents layouts, each the best scoring of a random tournament."""
+    entrants = self.rng.integers(len(scores), size=(num_parents, self.tournament_size))
+    return entrants[np.arange(num_parents), np.argmax(scores[entrants], axis=1)]
+
+
+  def crossover(self, first_parents, second_parents):
+    """Returns children taking a random band of rows from second_parents and the rest from first_parents, with no bulbs on forbidden squares."""
+    bands = np.sort(self.rng.integers(self.board.num_rows + 1, size=(len(first_parents), 2)), axis=1)
+    in_band = (self.cell_rows >= bands[:, :1]) & (self.cell_rows < bands[:, 1:])
+    return np.where(in_band, second_parents, first_parents) & ~self.forbidden_cells
+
+
+  def mutate(self, children):
+    """Mutates a random evolution_mutation_rate share of children in place with place_bulb() moves."""
+    for index in np.flatnonzero(self.rng.random(len(children)) < self.mutation_rate).tolist():
+      self.load_layout(children[index])
+      bulb_cells = [cell for cell in self.board.get_bulb_cells() if not self.board.locked_mask[cell]]
+
+      if bulb_cells:
+        self.board.remove_bulb(bulb_cells[self.rng.integers(len(bulb_cells))])
+
+      if self.board.placeable_cells:
+        self.board.place_bulb(self.board.placeable_cells[self.rng.integers(len(self.board.placeable_cells))])
+
+      children[index] = self.get_layout()
+      self.num_mutations += 1
+
+
+  def search(self, num_evals, num_generations, log):
+    """Evolves the population for num_generations generations or num_evals evaluations, whichever ends first.
+
+    Every improvement on the best valid layout is logged in log, and the best layout is left on the
+    board. Returns the search engine result (see SEARCH_ENGINES in light_up_puzzle_experiment.py).
+    """
+    max_run_fitness = 0
+    max_run_fitness_eval = 0
+    best_layout = None
+
+    population = np.array([self.get_random_layout() for individual in range(self.population_size)])
+    eval_count = 0
+
+    while self.num_generations < num_generations and eval_count < num_evals:
+      # The last generation is cut short if it would go over the evaluation budget
+      population = population[:num_evals - eval_count]
+      fitness, valid, conflicts, quota_violations = self.puzzle.evaluate_batch(population)
+
+      for count in range(eval_count + 1, eval_count + len(population) + 1):
+        log.record_progress(count)
+
+      valid_fitness = np.where(valid, fitness, 0)
+      best = int(np.argmax(valid_fitness))
+
+      if valid_fitness[best] > max_run_fitness:
+        max_run_fitness = int(valid_fitness[best])
+        max_run_fitness_eval = eval_count + best + 1
+        best_layout = population[best].copy()
+        log.record_fitness(max_run_fitness_eval, max_run_fitness)
+
+      eval_count += len(population)
+      self.num_generations += 1
+
+      # Breed the next generation
+      scores = fitness - self.penalty * conflicts
+
+      if self.enforce_adj_quotas:
+        scores -= self.penalty * quota_violations
+
+      num_children = self.population_size - 1
+      parents = self.select(scores, 2 * num_children)
+      children = self.crossover(population[parents[:num_children]], population[parents[num_children:]])
+      self.mutate(children)
+
+      population = np.concatenate([population[np.argmax(scores)][np.newaxis], children])
+
+    log.record_summary('evolution', [('generations', self.num_generations), ('mutations', self.num_mutations), ('repaired bulbs', self.num_repaired_bulbs)])
+
+    if best_layout is None:
+      self.board.clear_bulbs()
+      return (0, 0, None, eval_count)
+
+    self.load_layout(best_layout)
+
+    return (max_run_fitness, max_run_fitness_eval, self.puzzle.get_soln_str(), eval_count)
@@ -0,0 +1,212 @@
+import time
+import light_up_puzzle_bitboard as bitboard
+
+
+class LightUpPuzzleExactSolver:
+  def __init__(self, board, enforce_adj_quotas):
+    """Initializes the exact solver class.
+
+    The solver searches the puzzle on board (a LightUpPuzzleBoard) by backtracking, starting from
+    the bulbs and forbidden squares already on the board. Sets of squares are Python int bitsets,
+    with bit cell standing for the square at index cell (see
+    light_up_puzzle_bitboard.get_board_masks()):
+      self.white_mask   Every white square
+      self.light_masks  For each white square, its row segment and column segment (the squares a
+                        bulb there lights)
+      self.quotas       A (neighbour bitset, adjacency value) pair for each black square with an
+                        adjacency quota, if enforce_adj_quotas is set
+    """
+    self.board = board
+    self.white_mask, self.light_masks, self.quotas = bitboard.get_board_masks(board, enforce_adj_quotas)
+
+    self.num_nodes = 0
+    self.best_bulbs = 0
+    self.best_fitness = -1 # No valid state found yet
+
+
+  def propagate(self, bulbs, lit, forbidden):
+    """Applies the adjacency quota rules to a search state until it stops changing.
+
+    A black square whose quota is met forbids its free neighbours, and one needing all of its free
+    neighbours forces bulbs on them. Returns the new (bulbs, lit, forbidden) state, or None if the
+    state breaks a quota or two forced bulbs shine on eachother.
+    """
+    changed = True
+
+    while changed:
+      changed = False
+      placeable = self.white_mask & ~lit & ~forbidden
+
+      for adj_mask, value in self.quotas:
+        num_adj_bulbs = (bulbs & adj_mask).bit_count()
+        free_mask = adj_mask & placeable
+        num_free = free_mask.bit_count()
+
+        if num_adj_bulbs > value or num_adj_bulbs + num_free < value:
+          return None
+
+        if not num_free:
+          continue
+
+        if num_adj_bulbs == value:
+          forbidden |= free_mask
+
+        elif num_adj_bulbs + num_free == value:
+          for cell in bitboard.get_cell_bits(free_mask):
+            if lit >> cell & 1:
+              return None # An earlier forced bulb already shines here
+
+            bulbs |= 1 << cell
+            lit |= self.light_masks[cell]
+
+        else:
+          continue
+
+        changed = True
+        placeable = self.white_mask & ~lit & ~forbidden
+
+    return (bulbs, lit, forbidden)
+
+
+  def get_branch_cells(self, lit, forbidden):
+    """Returns the squares to branch on in a search state.
+
+    Picks the unlit square that the fewest placeable squares can light (the most constrained one)
+    and returns those squares. Returns an empty list if every white square is lit, and None if some
+    unlit square can no longer be lit.
+    """
+    unlit = self.white_mask & ~lit
+
+    if not unlit:
+      return []
+
+    placeable = unlit & ~forbidden
+    best_lighters = None
+    best_num_lighters = -1
+
+    for cell in bitboard.get_cell_bits(unlit):
+      lighters = self.light_masks[cell] & placeable
+      num_lighters = lighters.bit_count()
+
+      if num_lighters == 0:
+        return None
+
+      if best_num_lighters == -1 or num_lighters < best_num_lighters:
+        best_lighters = lighters
+        best_num_lighters = num_lighters
+
+        if num_lighters == 1:
+          break
+
+    return bitboard.get_cell_bits(best_lighters)
+
+
+  def is_valid(self, bulbs):
+    """Returns True if the bitset bulbs meets every adjacency quota exactly (no bulbs ever shine on eachother)."""
+    for adj_mask, value in self.quotas:
+      if (bulbs & adj_mask).bit_count() != value:
+        return False
+
+    return True
+
+
+  def visit(self, state, on_improvement):
+    """Counts a search node and records state as the best partial solution if it lights the most squares.
+
+    Only valid states count, as with the other search engines: a partial solution with a quota not
+    yet met is never recorded.
+    """
+    self.num_nodes += 1
+    fitness = state[1].bit_count()
+
+    if fitness > self.best_fitness and self.is_valid(state[0]):
+      self.best_fitness = fitness
+      self.best_bulbs = state[0]
+
+      if on_improvement:
+        on_improvement(self.num_nodes, fitness)
+
+
+  def solve(self, node_budget=0, time_budget=0, on_improvement=None):
+    """Searches for a complete solution by depth-first backtracking.
+
+    Each node lights the most constrained unlit square, trying every square that could light it in
+    turn; squares already tried are forbidden in the later branches. The search stops after
+    node_budget nodes or time_budget seconds (0 for no limit). on_improvement(node count, fitness)
+    is called whenever a valid partial solution lights more squares than any before it (see visit()).
+
+    Returns True if a complete solution was found (it is then self.best_bulbs), False if the search
+    proved there is none, and None if the budget ran out first.
+    """
+    start_time = time.time()
+    bulbs = 0
+    lit = 0
+    forbidden = 0
+
+    for cell in range(self.board.num_cells):
+      if self.board.bulb_mask[cell]:
+        bulbs |= 1 << cell
+        lit |= self.light_masks[cell]
+
+      if self.board.forbidden_mask[cell]:
+        forbidden |= 1 << cell
+
+    state = self.propagate(bulbs, lit, forbidden)
+
+    if state is None:
+      return False
+
+    self.visit(state, on_improvement)
+    branch_cells = self.get_branch_cells(state[1], state[2])
+
+    if branch_cells is None:
+      return False
+
+    if not branch_cells:
+      return True
+
+    # Each frame holds a node's state and the squares still to try
+    stack = [[state[0], state[1], state[2], branch_cells, 0]]
+
+    while stack:
+      if (node_budget and self.num_nodes >= node_budget) or (time_budget and time.time() - start_time >= time_budget):
+        return None
+
+      frame = stack[-1]
+
+      if frame[4] == len(frame[3]):
+        stack.pop()
+        continue
+
+      cell = frame[3][frame[4]]
+      frame[4] += 1
+
+      child_state = self.propagate(frame[0] | 1 << cell, frame[1] | self.light_masks[cell], frame[2])
+      frame[2] |= 1 << cell # Later branches don't put a bulb here
+
+      if child_state is None:
+        continue
+
+      self.visit(child_state, on_improvement)
+      branch_cells = self.get_branch_cells(child_state[1], child_state[2])
+
+      if branch_cells is None:
+        continue
+
+      if not branch_cells:
+        self.best_bulbs = child_state[0]
+        self.best_fitness = child_state[1].bit_count()
+        return True
+
+      stack.append([child_state[0], child_state[1], child_state[2], branch_cells, 0])
+
+    return False
+
+
+  def apply_best(self):
+    """Replaces the (unlocked) bulbs on the board with the best valid solution found."""
+    self.board.clear_bulbs()
+
+    for cell in bitboard.get_cell_bits(self.best_bulbs):
+      if not self.board.bulb_mask[cell]:
+        self.board.place_bulb(cell)
@@ -0,0 +1,501 @@
+import cProfile
+import copy
+import multiprocessing
+import os
+import time
+import light_up_puzzle as puzzle_class
+import light_up_puzzle_cache as cache_class
+import light_up_puzzle_checkpoint as checkpoint_class
+import light_up_puzzle_exact_solver as exact_solver_class
+import light_up_puzzle_local_search as local_search_class
+import light_up_puzzle_log as log_class
+import light_up_puzzle_profile as profile_class
+import light_up_puzzle_symmetry as symmetry
+
+
+def get_base_seed(config):
+  """Returns the seed that every run's seed is derived from.
+
+  This is the external seed from the configuration file, or the system time if use_external_seed
+  is off.
+  """
+  if config.settings["use_external_seed"]:
+    return config.settings["seed"]
+
+  return time.time()
+
+
+def get_run_seed(base_seed, run_count):
+  """Returns the seed for run number run_count (counting from 1)."""
+  return base_seed + run_count - 1
+
+
+def run_random_search(puzzle, config, log, checkpoint=None):
+  """Runs random search on puzzle for num_fitness_evaluations evaluations, caching their results if eval_cache_size is set.
+
+  If checkpoint (a LightUpPuzzleCheckpoint) is given, the run's state is saved to it every checkpoint_interval
+  evaluations. Returns the search engine result (see SEARCH_ENGINES).
+  """
+  max_run_fitness = 0
+  max_run_fitness_eval = 0
+  soln_str = None
+
+  num_evals = config.settings["num_fitness_evaluations"]
+  cache = None
+  num_skipped_duplicates = 0
+  duplicate_streak = 0
+
+  if config.settings["eval_cache_size"]:
+    cache = cache_class.LightUpPuzzleEvalCache(config.settings["eval_cache_size"])
+    # Duplicates may be skipped instead of counted, and layouts may share a hash with their rotations and reflections
+    skip_duplicates = config.settings["eval_cache_skip_duplicates"]
+    symmetries = symmetry.get_board_symmetries(puzzle.board) if config.settings["eval_cache_use_symmetries"] else []
+    puzzle.board.enable_bulb_hashing(symmetries=symmetries)
+
+  eval_count = 0
+  run_state = checkpoint.get_run_state(log.run_count) if checkpoint else None
+
+  if run_state:
+    # Continue from the checkpoint
+    checkpoint_class.set_board_state(puzzle.board, run_state['board'])
+    checkpoint_class.set_random_state(run_state['random_state'])
+    log.buffer = run_state['log_str']
+    log.fitness_history = run_state['fitness_history']
+    eval_count = run_state['eval_count']
+    max_run_fitness = run_state['max_run_fitness']
+    max_run_fitness_eval = run_state['max_run_fitness_eval']
+    soln_str = run_state['soln_str']
+
+    if cache:
+      cache.set_state(run_state['cache'])
+      num_skipped_duplicates = run_state['num_skipped_duplicates']
+      duplicate_streak = run_state['duplicate_streak']
+
+  while eval_count < num_evals:
+    if not puzzle.place_bulb_randomly():
+      # There are no more options for placing bulbs. Clear the board of bulbs
+      puzzle.clear_board()
+
+    bulb_hash = puzzle.board.get_canonical_bulb_hash() if cache else None
+    cached_result = cache.get(bulb_hash) if cache else None
+    is_duplicate = not cached_result is None
+
+    if is_duplicate and skip_duplicates:
+      num_skipped_duplicates += 1
+      duplicate_streak += 1
+
+      if duplicate_streak == num_evals:
+        # The search has likely seen every layout it can reach
+        break
+
+      continue
+
+    eval_count += 1
+    log.record_progress(eval_count)
+
+    if is_duplicate:
+      # The layout was scored before, so its cached result stands in for scoring it again
+      is_valid, fitness = cached_result
+
+    else:
+      duplicate_streak = 0
+      is_valid, fitness = puzzle.score()
+
+      if cache:
+        cache.put(bulb_hash, is_valid, fitness)
+
+    if is_valid and fitness > max_run_fitness:
+      max_run_fitness = fitness
+      max_run_fitness_eval = eval_count
+
+      # This is the best fitness we've found for this run
+      # Record it for the log file
+      log.record_fitness(eval_count, fitness)
+      soln_str = puzzle.get_soln_str()
+
+    if checkpoint and checkpoint.interval and eval_count % checkpoint.interval == 0 and eval_count < num_evals:
+      checkpoint.save_run({'run_count': log.run_count, 'eval_count': eval_count, 'random_state': checkpoint_class.get_random_state(),
+                           'board': checkpoint_class.get_board_state(puzzle.board), 'log_str': log.buffer, 'fitness_history': log.fitness_history,
+                           'max_run_fitness': max_run_fitness, 'max_run_fitness_eval': max_run_fitness_eval, 'soln_str': soln_str,
+                           'cache': cache.get_state() if cache else None,
+                           'num_skipped_duplicates': num_skipped_duplicates, 'duplicate_streak': duplicate_streak})
+
+  if cache:
+    log.record_summary('evaluation cache', cache.get_summary_fields() + [('board symmetries', len(symmetries) + 1), ('skipped duplicates', num_skipped_duplicates)])
+
+  return (max_run_fitness, max_run_fitness_eval, soln_str, eval_count)
+
+
+def run_exact_search(puzzle, config, log, checkpoint=None):
+  """Searches puzzle with the exact backtracking solver (see light_up_puzzle_exact_solver.py).
+
+  Every valid partial solution lighting more squares than the ones before it is logged, with the
+  search node count standing in for the evaluation count. Partial solutions with an adjacency quota
+  not yet met are not valid, so they are never logged or kept, as with the other engines. The search
+  is limited by exact_solver_node_budget and exact_solver_time_budget (0 for no limit).
+
+  Returns the search engine result (see SEARCH_ENGINES), counting search nodes as evaluations and
+  preferring a complete solution to the best valid partial one.
+  """
+  solver = exact_solver_class.LightUpPuzzleExactSolver(puzzle.board, config.settings["enforce_adj_quotas"])
+  improvements = []
+
+  start_time = time.time()
+  is_solved = solver.solve(config.settings["exact_solver_node_budget"], config.settings["exact_solver_time_budget"], lambda node_count, fitness: improvements.append((node_count, fitness)))
+  solve_time = time.time() - start_time
+
+  for node_count, fitness in improvements:
+    log.record_fitness(node_count, fitness)
+
+  if is_solved:
+    result = 'complete solution found'
+  elif is_solved is None:
+    result = 'budget exhausted, best valid partial solution kept'
+  else:
+    result = 'no complete solution exists'
+
+  log.record_summary('exact solver', [('result', result), ('nodes', solver.num_nodes), ('time', solve_time, '{:.6f} seconds')])
+
+  if not improvements:
+    return (0, 0, None, solver.num_nodes)
+
+  solver.apply_best()
+
+  return (improvements[-1][1], improvements[-1][0], puzzle.get_soln_str(), solver.num_nodes)
+
+
+def run_local_search(puzzle, config, log, checkpoint=None):
+  """Runs local search (see light_up_puzzle_local_search.py) on puzzle for num_fitness_evaluations moves."""
+  local_search = local_search_class.LightUpPuzzleLocalSearch(puzzle, config)
+  return local_search.search(config.settings["num_fitness_evaluations"], log)
+
+
+def run_evolution_search(puzzle, config, log, checkpoint=None):
+  """Runs the evolutionary search (see light_up_puzzle_evolution.py) on puzzle.
+
+  The search stops after evolution_num_generations generations or num_fitness_evaluations
+  evaluations, whichever comes first. Requires NumPy.
+  """
+  import light_up_puzzle_evolution as evolution_class
+
+  evolution = evolution_class.LightUpPuzzleEvolution(puzzle, config)
+  return evolution.search(config.settings["num_fitness_evaluations"], config.settings["evolution_num_generations"], log)
+
+
+# Search engines selectable with the search_engine config key. Each is called with (puzzle, config, log,
+# checkpoint) and returns a tuple (best fitness, evaluation at which it was first reached, solution string
+# of that board, number of evaluations done), where the solution string is None if no valid board has a
+# fitness above 0. Only random search saves checkpoints part way through a run; the other engines ignore
+# checkpoint and an interrupted run starts over
+SEARCH_ENGINES = {'random': run_random_search, 'exact': run_exact_search, 'local': run_local_search,
+                  'evolution': run_evolution_search}
+
+
+def run_experiment(config, run_count, seed_val, board=None, checkpoint=None, board_index=None):
+  """Performs one run of the search engine selected by search_engine on a new puzzle instance seeded with seed_val.
+
+  board, checkpoint and board_index are passed on to the puzzle and search engine. Returns a dictionary of the
+  run's log buffer, best fitness and solution string, board size, timings and evaluation count.
+  """
+  num_skipped_duplicates = board_index.num_skipped_duplicates if board_index else 0
+
+  start_time = time.perf_counter()
+  puzzle = puzzle_class.LightUpPuzzle(config, seed_val, board, board_index)
+  generation_time = time.perf_counter() - start_time
+
+  log = log_class.LightUpPuzzleLog(config, run_count)
+  log.record_header(puzzle.log_str)
+
+  if board_index:
+    log.record_summary('board index', [('boards', len(board_index.board_hashes)), ('skipped duplicates', board_index.num_skipped_duplicates - num_skipped_duplicates),
+                                       ('skipped duplicates (all runs)', board_index.num_skipped_duplicates)])
+
+  profiler = None
+  cprofile = None
+
+  if config.settings["enable_profiling"]:
+    # Time the puzzle's hot functions on this run's instances only
+    profiler = profile_class.LightUpPuzzleProfiler()
+    profiler.add('generate_linear_board' if config.settings["board_generator"] == 'linear' else 'generate_random_board', puzzle.num_generation_attempts, puzzle.generator_time)
+
+    for obj, name in [(puzzle.board, 'place_bulb'), (puzzle, 'place_bulb_randomly'), (puzzle, 'check_valid_solution'), (puzzle, 'score'), (puzzle, 'check_completely_solved')]:
+      profiler.instrument(obj, name)
+
+  if config.settings["profile_run"] == run_count:
+    # Also run the search under cProfile, writing its statistics (readable with pstats) to profile_dump_path
+    cprofile = cProfile.Profile()
+    cprofile.enable()
+
+  start_time = time.perf_counter()
+  max_run_fitness, max_run_fitness_eval, soln_str, num_evals = SEARCH_ENGINES[config.settings["search_engine"]](puzzle, config, log, checkpoint)
+  search_time = time.perf_counter() - start_time
+
+  if cprofile:
+    cprofile.disable()
+    cprofile.dump_stats(config.settings["profile_dump_path"])
+
+  if profiler:
+    log.record_summary('profile', profiler.get_summary_fields())
+
+  log.record_run_end(max_run_fitness)
+
+  return {'run_count': run_count, 'log_str': log.buffer, 'fitness_history': log.fitness_history, 'max_run_fitness': max_run_fitness,
+          'max_run_fitness_eval': max_run_fitness_eval, 'soln_str': soln_str,
+          'num_cells': puzzle.board.num_cells, 'num_black_squares': puzzle.board.num_black_squares, 'generation_time': generation_time, 'search_time': search_time,
+          'num_evals': num_evals}
+
+
+def run_experiment_args(args):
+  """Calls run_experiment() with the argument tuple args (used with process pools)."""
+  return run_experiment(*args)
+
+
+def write_soln_file(config, soln_str):
+  """Writes soln_str to the solution file specified in the configuration file."""
+  with open(config.settings["soln_file_path"], 'w') as soln_file:
+    soln_file.write(soln_str)
+
+
+def write_results(config, results, checkpoint=None):
+  """Writes the log and solution files for an iterable of run results, given in run order.
+
+  Each run's log buffer is appended to the log file as it arrives. The solution file holds the
+  solution of the first run to reach the best fitness. It is written once all runs are done, and
+  also after every soln_checkpoint_interval runs if that is not 0. If enable_profiling is set, the
+  calls and time of these writes are added to the end of the log file. If trajectory_interval is not
+  0, each run's fitness trajectory is written to trajectory_file_path as it arrives (see
+  light_up_puzzle_trajectory.py).
+
+  If checkpoint (a LightUpPuzzleCheckpoint) is given, it is saved after every run. If it was loaded
+  from a checkpoint file, the log file is cut back to the runs it covers and appended to, instead
+  of being started over.
+  Returns the best run's result (None if no run found a valid board with a fitness above 0).
+  """
+  best_result = None
+  soln_file_is_current = True
+
+  write_log_header = log_class.write_log_header
+  append_to_log = log_class.append_to_log
+  write_soln = write_soln_file
+  profiler = None
+  trajectory_file = None
+  is_resumed = bool(checkpoint and checkpoint.state['log_size'])
+
+  if config.settings["enable_profiling"]:
+    profiler = profile_class.LightUpPuzzleProfiler()
+    write_log_header = profiler.timed(write_log_header, 'write_log_header')
+    append_to_log = profiler.timed(append_to_log, 'append_to_log')
+    write_soln = profiler.timed(write_soln, 'write_soln_file')
+
+  if config.settings["trajectory_interval"]:
+    import light_up_puzzle_trajectory as trajectory_class
+
+    trajectory_file = trajectory_class.LightUpPuzzleTrajectoryFile(config, is_resumed)
+
+  if is_resumed:
+    # Resume: drop anything logged after the checkpoint was saved
+    with open(config.settings["log_file_path"], 'r+') as log:
+      log.truncate(checkpoint.state['log_size'])
+
+    best_result = checkpoint.state['best_result']
+    soln_file_is_current = best_result is None
+
+  else:
+    write_log_header(config)
+
+    if checkpoint:
+      checkpoint.state['log_size'] = os.path.getsize(config.settings["log_file_path"])
+      checkpoint.save()
+
+  for result in results:
+    append_to_log(config, result['log_str'])
+
+    if trajectory_file:
+      trajectory_file.write_run(result['run_count'], result['fitness_history'])
+
+    if result['max_run_fitness'] > (best_result['max_run_fitness'] if best_result else 0):
+      # This is the best fitness we've found overall
+      best_result = result
+      soln_file_is_current = False
+
+    interval = config.settings["soln_checkpoint_interval"]
+
+    if interval and result['run_count'] % interval == 0 and not soln_file_is_current:
+      write_soln(config, best_result['soln_str'])
+      soln_file_is_current = True
+
+    if checkpoint:
+      checkpoint.save_run_end(result['run_count'], os.path.getsize(config.settings["log_file_path"]), best_result)
+
+  if not soln_file_is_current:
+    write_soln(config, best_result['soln_str'])
+
+  if trajectory_file:
+    trajectory_file.close()
+
+  if profiler:
+    # Summary of the file writes of the whole experiment, under run 0
+    log = log_class.LightUpPuzzleLog(config, 0)
+    log.record_summary('file write profile', profiler.get_summary_fields())
+    log_class.append_to_log(config, log.buffer)
+
+  return best_result
+
+
+def run_experiments(config, num_workers, resume=False):
+  """Performs every experiment run and writes the log and solution files.
+
+  Runs are spread across a pool of num_workers processes when num_workers is greater than 1.
+  Results are merged in run order, so the files match those of a serial run with the same seeds.
+
+  If checkpoint_interval is not 0 or resume is set, progress is saved to checkpoint_file_path (see
+  light_up_puzzle_checkpoint.py), which is deleted once every run is done. With resume set, the
+  experiment continues from that file if it exists, giving the same files as an uninterrupted run.
+  Checkpoints within a run are only saved when runs are not spread across processes.
+
+  If skip_duplicate_boards and generate_board are set, every run's generated board is kept in a
+  board index (see light_up_puzzle_symmetry.py) and later runs generate a new board rather than a
+  rotation or reflection of one of them. Like checkpoints within a run, this needs the runs to be
+  done in one process, so it is off when num_workers is greater than 1.
+  Returns the best run's result (see write_results()).
+  """
+  checkpoint = None
+  first_run_count = 1
+  board_index = None
+
+  if config.settings["skip_duplicate_boards"] and config.settings["generate_board"] and num_workers <= 1:
+    board_index = symmetry.LightUpPuzzleBoardIndex()
+
+  if config.settings["checkpoint_interval"] or resume:
+    checkpoint = checkpoint_class.LightUpPuzzleCheckpoint(config)
+
+    if resume and os.path.exists(config.settings["checkpoint_file_path"]):
+      checkpoint.load()
+      first_run_count = checkpoint.state['run_count']
+
+      if board_index and checkpoint.state['board_index']:
+        board_index.set_state(checkpoint.state['board_index'])
+
+    else:
+      checkpoint.start(get_base_seed(config))
+
+    base_seed = checkpoint.state['base_seed']
+    checkpoint.board_index = board_index
+
+  else:
+    base_seed = get_base_seed(config)
+
+  run_checkpoint = checkpoint if num_workers <= 1 else None
+  run_args = [(config, run_count, get_run_seed(base_seed, run_count), None, run_checkpoint, board_index) for run_count in range(first_run_count, config.settings["num_experiment_runs"] + 1)]
+  pool = None
+
+  if num_workers > 1:
+    pool = multiprocessing.Pool(num_workers)
+    results = pool.imap(run_experiment_args, run_args)
+
+  else:
+    results = map(run_experiment_args, run_args)
+
+  try:
+    best_result = write_results(config, results, checkpoint)
+
+  finally:
+    if pool:
+      pool.close()
+      pool.join()
+
+  if checkpoint:
+    checkpoint.remove()
+
+  return best_result
+
+
+def get_puzzle_file_paths(batch_path):
+  """Returns the puzzle files making up the puzzle set at batch_path.
+
+  batch_path is either a directory, in which case every .txt and .lup (binary, see
+  light_up_puzzle_binary.py) file in it is used (in name order), or a manifest file listing one
+  puzzle file per line. Manifest paths are relative to the manifest's
+  directory; blank lines and lines starting with '#' are ignored.
+  """
+  if os.path.isdir(batch_path):
+    return [os.path.join(batch_path, file_name) for file_name in sorted(os.listdir(batch_path)) if file_name.endswith(('.txt', '.lup'))]
+
+  puzzle_file_paths = []
+
+  with open(batch_path, 'r') as manifest:
+    for line in manifest:
+      line = line.strip()
+
+      if line and not line.startswith('#'):
+        puzzle_file_paths.append(os.path.join(os.path.dirname(batch_path), line))
+
+  return puzzle_file_paths
+
+
+def solve_puzzle(config, puzzle_file_path):
+  """Performs every experiment run on the puzzle in puzzle_file_path.
+
+  The puzzle file is read once and its board is reused by every run. The log and solution files (and
+  trajectory file, if trajectory_interval is not 0) are written to batch_output_dir_path, named after
+  the puzzle file.
+
+  Returns a dictionary holding the puzzle file path, the best fitness found ('max_fitness'), the
+  evaluation of its run at which it was reached ('evals_to_max') and the wall time in seconds.
+  """
+  start_time = time.time()
+  puzzle_name = os.path.splitext(os.path.basename(puzzle_file_path))[0]
+
+  puzzle_config = copy.deepcopy(config)
+  puzzle_config.settings["generate_board"] = 0
+  puzzle_config.settings["input_file_path"] = puzzle_file_path
+  puzzle_config.settings["log_file_path"] = os.path.join(config.settings["batch_output_dir_path"], puzzle_name + '_log.txt')
+  puzzle_config.settings["soln_file_path"] = os.path.join(config.settings["batch_output_dir_path"], puzzle_name + '_soln.txt')
+  puzzle_config.settings["trajectory_file_path"] = os.path.join(config.settings["batch_output_dir_path"], puzzle_name + '_trajectory.npy')
+
+  board = puzzle_class.read_puzzle_file(puzzle_file_path, config.settings["adj_value_dont_care"])
+  base_seed = get_base_seed(config)
+  results = (run_experiment(puzzle_config, run_count, get_run_seed(base_seed, run_count), board) for run_count in range(1, config.settings["num_experiment_runs"] + 1))
+  best_result = write_results(puzzle_config, results)
+
+  return {'puzzle_file_path': puzzle_file_path,
+          'max_fitness': best_result['max_run_fitness'] if best_result else 0,
+          'evals_to_max': best_result['max_run_fitness_eval'] if best_result else 0,
+          'wall_time': time.time() - start_time}
+
+
+def solve_puzzle_args(args):
+  """Calls solve_puzzle() with the argument tuple args (used with process pools)."""
+  return solve_puzzle(*args)
+
+
+def run_batch(config, batch_path, num_workers):
+  """Solves every puzzle in the puzzle set at batch_path (see get_puzzle_file_paths()).
+
+  Puzzles are streamed through a pool of num_workers processes when num_workers is greater than 1.
+  One log and solution file is written per puzzle, plus a summary table (batch_summary.txt) listing
+  each puzzle's best fitness, evaluations to reach it and wall time.
+  """
+  os.makedirs(config.settings["batch_output_dir_path"], exist_ok=True)
+  puzzle_args = [(config, puzzle_file_path) for puzzle_file_path in get_puzzle_file_paths(batch_path)]
+  pool = None
+
+  if num_workers > 1:
+    pool = multiprocessing.Pool(num_workers)
+    summaries = pool.imap(solve_puzzle_args, puzzle_args)
+
+  else:
+    summaries = map(solve_puzzle_args, puzzle_args)
+
+  try:
+    with open(os.path.join(config.settings["batch_output_dir_path"], 'batch_summary.txt'), 'w') as summary_file:
+      summary_file.write('puzzle\tbest fitness\tevals to best\twall time (s)\n')
+
+      for summary in summaries:
+        summary_file.write('%s\t%i\t%i\t%.3f\n' % (summary['puzzle_file_path'], summary['max_fitness'], summary['evals_to_max'], summary['wall_time']))
+        summary_file.flush()
+
+  finally:
+    if pool:
+      pool.close()
+      pool.join()
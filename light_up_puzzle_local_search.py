@@ -0,0 +1,199 @@
+import math
+import random
+
+
+class LightUpPuzzleLocalSearch:
+  def __init__(self, puzzle, config):
+    """Initializes the local search class.
+
+    The search moves bulbs around on puzzle.board one at a time. A move is one of:
+      'add'    Put a bulb on a random placeable square
+      'remove' Take a random (unlocked) bulb off the board
+      'move'   Take a random bulb off the board and put one on a random placeable square
+
+    Moves are scored by their change in the objective, the number of lit squares minus
+    local_search_quota_penalty per black square missing its adjacency value (quotas only count if
+    enforce_adj_quotas is set). The board keeps these counts up to date as bulbs are placed and
+    removed (the bitboard backend scores the board instead), so a move is scored by applying it and
+    reading the counters, without rescanning the board, and undone if it is rejected.
+
+    Worse moves are accepted with the simulated annealing probability exp(delta / temperature). The
+    temperature starts at local_search_initial_temperature and is multiplied by
+    local_search_cooling_rate after every move; a temperature of 0 gives plain hill climbing. After
+    local_search_restart_interval moves without improving on the restart's best objective, the board
+    is cleared and the temperature reset (0 disables restarts).
+    """
+    self.puzzle = puzzle
+    self.board = puzzle.board
+    self.config = config
+
+    if config.settings["enforce_adj_quotas"]:
+      self.quota_penalty = config.settings["local_search_quota_penalty"]
+    else:
+      self.quota_penalty = 0
+
+    self.move_types = ['add', 'remove', 'move']
+    self.move_probabilities = config.settings["local_search_move_probabilities"]
+
+    # Bulbs that moves may take off the board, with each one's position in the list
+    self.bulb_cells = []
+    self.bulb_positions = {}
+
+    for cell in self.board.get_bulb_cells():
+      if not self.board.locked_mask[cell]:
+        self.add_bulb_cell(cell)
+
+    self.num_restarts = 0
+    self.num_accepted_moves = 0
+
+
+  def get_objective(self):
+    """Returns the objective value of the board: lit squares minus the quota penalty."""
+    if self.puzzle.bitboard:
+      # The bitboard backend replaces the board's quota counters
+      fitness, is_valid, conflicts, quota_violations = self.puzzle.evaluate_bitboard()
+      return fitness - self.quota_penalty * quota_violations
+
+    return self.board.num_lit_squares - self.quota_penalty * self.board.num_quota_violations
+
+
+  def add_bulb_cell(self, cell):
+    """Adds cell to the list of removable bulbs."""
+    self.bulb_positions[cell] = len(self.bulb_cells)
+    self.bulb_cells.append(cell)
+
+
+  def remove_bulb_cell(self, cell):
+    """Removes cell from the list of removable bulbs by swapping the last entry into its place."""
+    position = self.bulb_positions.pop(cell)
+    last_cell = self.bulb_cells.pop()
+
+    if last_cell != cell:
+      self.bulb_cells[position] = last_cell
+      self.bulb_positions[last_cell] = position
+
+
+  def place(self, cell):
+    """Puts a bulb on placeable square cell."""
+    self.board.place_bulb(cell)
+    self.add_bulb_cell(cell)
+
+
+  def remove(self, cell):
+    """Takes the (unlocked) bulb at cell off the board."""
+    self.board.remove_bulb(cell)
+    self.remove_bulb_cell(cell)
+
+
+  def get_random_placeable_cell(self):
+    """Returns a random square where a bulb can be placed, or None if there is none."""
+    if not self.board.placeable_cells:
+      return None
+
+    return self.board.placeable_cells[random.randrange(len(self.board.placeable_cells))]
+
+
+  def make_move(self):
+    """Applies a random move to the board.
+
+    Returns a (move type, removed cell, placed cell) tuple describing it for undo_move(); the cells are
+    None where unused. Moves that are impossible on the current board fall back to one that is not.
+    """
+    move_type = random.choices(self.move_types, self.move_probabilities)[0]
+
+    if move_type == 'add' and not self.board.placeable_cells:
+      move_type = 'move'
+
+    if move_type != 'add' and not self.bulb_cells:
+      move_type = 'add'
+
+    removed_cell = None
+    placed_cell = None
+
+    if move_type != 'add':
+      removed_cell = self.bulb_cells[random.randrange(len(self.bulb_cells))]
+      self.remove(removed_cell)
+
+    if move_type != 'remove':
+      placed_cell = self.get_random_placeable_cell()
+
+      if not placed_cell is None:
+        self.place(placed_cell)
+
+    return (move_type, removed_cell, placed_cell)
+
+
+  def undo_move(self, move):
+    """Reverts a move made by make_move()."""
+    move_type, removed_cell, placed_cell = move
+
+    if not placed_cell is None:
+      self.remove(placed_cell)
+
+    if not removed_cell is None:
+      self.place(removed_cell)
+
+
+  def restart(self):
+    """Clears the (unlocked) bulbs off the board."""
+    for cell in list(self.bulb_cells):
+      self.remove(cell)
+
+    self.num_restarts += 1
+
+
+  def search(self, num_evals, log):
+    """Runs num_evals moves, logging every improvement on the best valid board in log.
+
+    Returns the search engine result (see SEARCH_ENGINES in light_up_puzzle_experiment.py).
+    """
+    max_run_fitness = 0
+    max_run_fitness_eval = 0
+    soln_str = None
+
+    objective = self.get_objective()
+    best_restart_objective = objective
+    num_stale_evals = 0
+    temperature = self.config.settings["local_search_initial_temperature"]
+
+    for eval_count in range(1, num_evals + 1):
+      log.record_progress(eval_count)
+
+      move = self.make_move()
+      delta = self.get_objective() - objective
+
+      if delta >= 0 or (temperature > 0 and random.random() < math.exp(delta / temperature)):
+        objective += delta
+        self.num_accepted_moves += 1
+
+      else:
+        self.undo_move(move)
+
+      temperature *= self.config.settings["local_search_cooling_rate"]
+
+      is_valid, fitness = self.puzzle.score()
+
+      if is_valid and fitness > max_run_fitness:
+        max_run_fitness = fitness
+        max_run_fitness_eval = eval_count
+
+        log.record_fitness(eval_count, fitness)
+        soln_str = self.puzzle.get_soln_str()
+
+      if objective > best_restart_objective:
+        best_restart_objective = objective
+        num_stale_evals = 0
+
+      else:
+        num_stale_evals += 1
+
+      if num_stale_evals == self.config.settings["local_search_restart_interval"]:
+        self.restart()
+        objective = self.get_objective()
+        best_restart_objective = objective
+        num_stale_evals = 0
+        temperature = self.config.settings["local_search_initial_temperature"]
+
+    log.record_summary('local search', [('restarts', self.num_restarts), ('accepted moves', self.num_accepted_moves)])
+
+    return (max_run_fitness, max_run_fitness_eval, soln_str, num_evals)
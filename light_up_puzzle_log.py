@@ -0,0 +1,99 @@
+import json
+
+
+def write_log_header(config):
+  """Truncates the log file specified in the configuration file and writes its header."""
+  with open(config.settings["log_file_path"], 'w') as log:
+    if config.settings["log_format"] == 'jsonl':
+      log.write(json.dumps({'record': 'log'}) + '\n')
+
+    else:
+      log.write('Result Log\n\n')
+
+
+def append_to_log(config, log_str):
+  """Appends log_str (the buffer of a LightUpPuzzleLog) to the log file specified in the configuration file."""
+  with open(config.settings["log_file_path"], 'a') as log:
+    log.write(log_str)
+
+
+class LightUpPuzzleLog:
+  def __init__(self, config, run_count):
+    """Initializes the light up puzzle log class.
+
+    Records for experiment run run_count are kept in an in-memory buffer (self.buffer) so the log
+    file is written in one piece when the run ends (see append_to_log()). The run's fitness
+    improvements are also kept as a list of [evaluation, fitness] pairs (self.fitness_history), from
+    which its fitness trajectory is written (see light_up_puzzle_trajectory.py).
+
+    log_format selects the record format:
+      'text'  The plain text format read by gen_graphs.py
+      'jsonl' One JSON object per line, with a 'record' field naming the record type
+
+    log_verbosity selects what is printed to stdout:
+      0  Nothing
+      1  The best fitness of each run when it ends
+      2  Progress every progress_interval evaluations as well (0 disables progress)
+    """
+    self.run_count = run_count
+    self.log_format = config.settings["log_format"]
+    self.verbosity = config.settings["log_verbosity"]
+    self.progress_interval = config.settings["progress_interval"]
+
+    if self.verbosity < 2:
+      self.progress_interval = 0
+
+    self.buffer = ''
+    self.fitness_history = []
+
+
+  def write_record(self, text, record):
+    """Adds a record to the buffer: text in the text format, or the dictionary record in JSON lines format."""
+    if self.log_format == 'jsonl':
+      self.buffer += json.dumps(record) + '\n'
+
+    else:
+      self.buffer += text
+
+
+  def record_header(self, header_str):
+    """Records the run header (seed, puzzle and settings description)."""
+    self.write_record(header_str, {'record': 'header', 'run': self.run_count, 'text': header_str})
+
+
+  def record_fitness(self, eval_count, fitness):
+    """Records a new best fitness for the run, found at evaluation eval_count."""
+    self.write_record('Run %i\n%i\t%i\n\n' % (self.run_count, eval_count, fitness), {'record': 'fitness', 'run': self.run_count, 'eval': eval_count, 'fitness': fitness})
+    self.fitness_history.append([eval_count, fitness])
+
+
+  def record_summary(self, title, fields):
+    """Records a summary section, such as search engine statistics.
+
+    fields is a list of (name, value) pairs, written one per line under title in the text format. A field
+    may also be a (name, value, text_format) triple, its value then being written as text_format.format(value)
+    in the text format only; the JSON lines format always holds the value itself.
+    """
+    text = title + '\n'
+    values = {}
+
+    for field in fields:
+      name, value = field[:2]
+      text += '\t' + name + ': ' + (field[2].format(value) if len(field) > 2 else str(value)) + '\n'
+      values[name] = value
+
+    self.write_record(text + '\n', {'record': 'summary', 'run': self.run_count, 'title': title, 'fields': values})
+
+
+  def record_progress(self, eval_count):
+    """Prints progress for evaluation eval_count if it falls on the progress interval."""
+    if self.progress_interval and eval_count % self.progress_interval == 0:
+      print("Run: %i\tEval count: %i" % (self.run_count, eval_count))
+
+
+  def record_run_end(self, max_run_fitness):
+    """Records the end of the run, which reached a best fitness of max_run_fitness."""
+    self.write_record('---------------------------\n\n', {'record': 'run_end', 'run': self.run_count, 'max_fitness': max_run_fitness})
+
+    if self.verbosity >= 1:
+      print("Run: %i\tBest fitness: %i" % (self.run_count, max_run_fitness))
@@ -0,0 +1,71 @@
+import time
+
+
+# How each function's statistics are written in the text log format
+SUMMARY_TEXT_FORMAT = '{0[calls]} calls, {0[failures]} returned False, {0[time]:.6f} seconds, {0[exclusive_time]:.6f} seconds exclusive'
+
+
+class LightUpPuzzleProfiler:
+  def __init__(self):
+    """Initializes the profiler class.
+
+    self.stats maps the name of each profiled function to a dictionary of its number of calls
+    ('calls'), calls that returned False ('failures', such as rejected bulb placements), cumulative
+    wall time in seconds ('time') and that time less the time spent in profiled functions it called
+    ('exclusive_time'). Functions are only timed once they are wrapped (see timed() and instrument()).
+    """
+    self.stats = {}
+    self.child_times = [] # Time spent in profiled calls made by each profiled call in progress
+
+
+  def get_stats(self, name):
+    """Returns the statistics of function name, creating them if needed."""
+    if not name in self.stats:
+      self.stats[name] = {'calls': 0, 'failures': 0, 'time': 0.0, 'exclusive_time': 0.0}
+
+    return self.stats[name]
+
+
+  def add(self, name, num_calls, elapsed_time):
+    """Adds num_calls calls taking elapsed_time seconds in total to the statistics of function name."""
+    stats = self.get_stats(name)
+    stats['calls'] += num_calls
+    stats['time'] += elapsed_time
+    stats['exclusive_time'] += elapsed_time
+
+
+  def timed(self, function, name):
+    """Returns a wrapper of function that adds each call to the statistics of function name."""
+    stats = self.get_stats(name)
+    perf_counter = time.perf_counter
+
+    child_times = self.child_times
+
+    def timed_function(*args):
+      child_times.append(0.0)
+      start_time = perf_counter()
+      result = function(*args)
+      elapsed_time = perf_counter() - start_time
+      stats['time'] += elapsed_time
+      stats['exclusive_time'] += elapsed_time - child_times.pop()
+      stats['calls'] += 1
+
+      if child_times:
+        child_times[-1] += elapsed_time
+
+      if result is False:
+        stats['failures'] += 1
+
+      return result
+
+    return timed_function
+
+
+  def instrument(self, obj, name):
+    """Replaces method name on instance obj (only) with a timed wrapper."""
+    setattr(obj, name, self.timed(getattr(obj, name), name))
+
+
+  def get_summary_fields(self):
+    """Returns the statistics of each function as a field for LightUpPuzzleLog.record_summary()."""
+    return [(name, dict(stats), SUMMARY_TEXT_FORMAT) for name, stats in self.stats.items()]
@@ -0,0 +1,91 @@
+import light_up_puzzle_board as board_class
+
+
+def get_lighter_cells(board, cell):
+  """Returns the squares where a bulb would light cell and could still be placed.
+
+  These are the unlit, non-forbidden squares of cell's row and column segments (cell included).
+  """
+  lighter_cells = []
+
+  for segment_id in [board.row_segments[cell], board.col_segments[cell]]:
+    for segment_cell in board.get_segment_cells(segment_id):
+      if not board.light_counts[segment_cell] and not board.forbidden_mask[segment_cell] and not segment_cell in lighter_cells:
+        lighter_cells.append(segment_cell)
+
+  return lighter_cells
+
+
+def propagate_constraints(board, enforce_adj_quotas):
+  """Locks in the bulbs and forbids the squares that every complete solution of board agrees on.
+
+  The following rules are applied until none of them changes the board:
+    1. A black square that already has its required adjacent bulbs forbids its other neighbours,
+       e.g. every neighbour of a 0 square is forbidden. (only if enforce_adj_quotas is set)
+    2. A black square whose required adjacent bulbs equal its adjacent bulbs plus its remaining free
+       neighbours forces bulbs on those neighbours, e.g. a 4 square. (only if enforce_adj_quotas is set)
+    3. An unlit square that can only be lit by a bulb on one square forces a bulb there.
+
+  Forced bulbs are locked (see LightUpPuzzleBoard.lock_bulb()) and forbidden squares are taken out of
+  the placeable pool. Propagation stops early if it finds that the board has no complete solution.
+
+  Returns a tuple (number of forced bulbs, number of forbidden squares, False if the board was found
+  to have no complete solution and True otherwise).
+  """
+  num_forced_bulbs = 0
+  num_forbidden_cells = 0
+  changed = True
+
+  while changed:
+    changed = False
+
+    if enforce_adj_quotas:
+      for cell in board.get_black_cells():
+        value = board.cells[cell]
+
+        if value >= board.adj_value_dont_care:
+          continue
+
+        num_adj_bulbs = board.adj_bulb_counts[cell]
+        free_cells = [c for c in board.get_adj_cells(cell) if board.cells[c] == board_class.WHITE_SQUARE and not board.light_counts[c] and not board.forbidden_mask[c]]
+
+        if num_adj_bulbs > value or num_adj_bulbs + len(free_cells) < value:
+          return (num_forced_bulbs, num_forbidden_cells, False)
+
+        if not free_cells:
+          continue
+
+        if num_adj_bulbs == value:
+          # Rule 1
+          for free_cell in free_cells:
+            board.forbid_cell(free_cell)
+            num_forbidden_cells += 1
+
+          changed = True
+
+        elif num_adj_bulbs + len(free_cells) == value:
+          # Rule 2
+          for free_cell in free_cells:
+            if not board.lock_bulb(free_cell):
+              return (num_forced_bulbs, num_forbidden_cells, False)
+
+            num_forced_bulbs += 1
+
+          changed = True
+
+    for cell in range(board.num_cells):
+      if board.cells[cell] != board_class.WHITE_SQUARE or board.light_counts[cell]:
+        continue
+
+      lighter_cells = get_lighter_cells(board, cell)
+
+      if not lighter_cells:
+        return (num_forced_bulbs, num_forbidden_cells, False)
+
+      if len(lighter_cells) == 1:
+        # Rule 3
+        board.lock_bulb(lighter_cells[0])
+        num_forced_bulbs += 1
+        changed = True
+
+  return (num_forced_bulbs, num_forbidden_cells, True)
@@ -0,0 +1,122 @@
+import copy
+import json
+import os
+import socket
+import time
+import light_up_puzzle_config as config_class
+import light_up_puzzle_experiment as experiment
+
+
+class LightUpPuzzleServer:
+  def __init__(self, config):
+    """Initializes the server class.
+
+    The server runs experiments (jobs) one after another in a single long-lived process, so each job
+    only pays for its own runs. Jobs are JSON objects, one per line, with the optional fields:
+      'id'       Echoed back in the response
+      'config'   Configuration file the job starts from (default: config, the server's own)
+      'puzzle'   Puzzle file to solve (sets generate_board to 0 and input_file_path)
+      'batch'    Puzzle set to solve instead (see experiment.run_batch())
+      'set'      Object of settings overriding the configuration
+      'workers'  Number of worker processes (default: 1)
+
+    Every job gets one JSON response line: {'id', 'status': 'ok', 'max_fitness', 'evals_to_max',
+    'wall_time'} or {'id', 'status': 'error', 'error'}. Configuration files are parsed once and
+    reused by later jobs.
+    """
+    self.config = config
+    self.configs = {}
+    self.num_jobs = 0
+
+
+  def get_job_config(self, job):
+    """Returns a validated copy of the configuration for job."""
+    config_file = job.get('config')
+
+    if config_file is None:
+      base_config = self.config
+
+    else:
+      if not config_file in self.configs:
+        self.configs[config_file] = config_class.LightUpPuzzleConfig(config_file)
+
+      base_config = self.configs[config_file]
+
+    settings = copy.deepcopy(base_config.settings)
+
+    for key in base_config.derived_keys:
+      # Derive these again, from the job's log_file_path
+      del settings[key]
+
+    if 'puzzle' in job:
+      settings["generate_board"] = 0
+      settings["input_file_path"] = job['puzzle']
+
+    settings.update(job.get('set', {}))
+
+    return config_class.LightUpPuzzleConfig(settings=settings)
+
+
+  def run_job(self, job):
+    """Runs job and returns its response."""
+    start_time = time.time()
+    config = self.get_job_config(job)
+    num_workers = job.get('workers', 1)
+    response = {'id': job.get('id'), 'status': 'ok'}
+
+    if 'batch' in job:
+      experiment.run_batch(config, job['batch'], num_workers)
+      response['summary_file_path'] = os.path.join(config.settings["batch_output_dir_path"], 'batch_summary.txt')
+
+    else:
+      best_result = experiment.run_experiments(config, num_workers)
+      response['max_fitness'] = best_result['max_run_fitness'] if best_result else 0
+      response['evals_to_max'] = best_result['max_run_fitness_eval'] if best_result else 0
+
+    response['wall_time'] = time.time() - start_time
+
+    return response
+
+
+  def serve(self, input_stream, output_stream):
+    """Answers the jobs read from input_stream, one per line, on output_stream until input_stream ends.
+
+    Blank lines are skipped. A job that fails gets an error response; the server keeps going.
+    """
+    for line in input_stream:
+      if not line.strip():
+        continue
+
+      job = {}
+
+      try:
+        job = json.loads(line)
+        response = self.run_job(job)
+
+      except Exception as error:
+        response = {'id': job.get('id') if isinstance(job, dict) else None, 'status': 'error', 'error': str(error)}
+
+      self.num_jobs += 1
+      output_stream.write(json.dumps(response) + '\n')
+      output_stream.flush()
+
+
+  def serve_socket(self, socket_path):
+    """Accepts connections on the Unix domain socket socket_path, answering each one's jobs in turn (see serve())."""
+    if os.path.exists(socket_path):
+      os.remove(socket_path)
+
+    server_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server_socket.bind(socket_path)
+    server_socket.listen()
+
+    try:
+      while True:
+        connection = server_socket.accept()[0]
+
+        with connection, connection.makefile('r') as input_stream, connection.makefile('w') as output_stream:
+          self.serve(input_stream, output_stream)
+
+    finally:
+      server_socket.close()
+      os.remove(socket_path)
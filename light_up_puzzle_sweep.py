@@ -0,0 +1,153 @@
+import copy
+import itertools
+import json
+import multiprocessing
+import resource
+import sys
+import light_up_puzzle_config as config_class
+import light_up_puzzle_experiment as experiment
+
+
+# Board generation settings; sweeping any of them turns generate_board on
+GENERATOR_SETTINGS = ['min_random_board_dimension', 'max_random_board_dimension', 'override_num_rows', 'override_num_cols',
+                      'black_square_placement_prob', 'black_square_value_probabilities']
+
+# Columns of the sweep table after the swept settings
+TABLE_COLUMNS = ['mean cells', 'mean black squares', 'generation time (s)', 'generation us/cell', 'evals/sec',
+                 'cells x evals/sec', 'mean best fitness', 'best fitness', 'peak memory (MB)']
+
+
+def parse_grids(grid_strs):
+  """Returns the parameter grids given as 'key=[value, ...]' strings (the --sweep command line option).
+
+  The values are a JSON list. Returns a list of (key, values) pairs in the order given.
+  """
+  grids = []
+
+  for grid_str in grid_strs:
+    key, separator, values_str = grid_str.partition('=')
+    values = config_class.parse_setting_value(values_str.strip())
+
+    if not separator or not isinstance(values, list) or not values:
+      raise ValueError("sweep '" + grid_str + "' is not of the form key=[value, ...]")
+
+    grids.append((key.strip(), values))
+
+  return grids
+
+
+def get_grid_points(config, grids):
+  """Returns a validated copy of config for every combination of the grids' values.
+
+  Returns a list of (values, config) pairs, values being the grid point's value of each swept
+  setting. If a generator setting is swept, generate_board is turned on. Sweeping override_num_rows
+  or override_num_cols also turns override_random_board_dimensions on, and sweeping
+  min/max_random_board_dimension turns it off, so the swept settings are the ones that apply.
+  Raises a ValueError if a grid point's settings are not valid.
+  """
+  keys = [key for key, values in grids]
+  points = []
+
+  for values in itertools.product(*[values for key, values in grids]):
+    settings = copy.deepcopy(config.settings)
+    settings.update(zip(keys, values))
+
+    if any(key in GENERATOR_SETTINGS for key in keys):
+      settings["generate_board"] = 1
+
+    if 'override_num_rows' in keys or 'override_num_cols' in keys:
+      settings["override_random_board_dimensions"] = 1
+
+    elif 'min_random_board_dimension' in keys or 'max_random_board_dimension' in keys:
+      settings["override_random_board_dimensions"] = 0
+
+    points.append((list(values), config_class.LightUpPuzzleConfig(settings=settings)))
+
+  return points
+
+
+def get_peak_memory():
+  """Returns the peak resident memory of this process in bytes."""
+  peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+  # ru_maxrss is in kilobytes, except on macOS
+  return peak_memory if sys.platform == 'darwin' else peak_memory * 1024
+
+
+def run_sweep_point(config, values):
+  """Performs every experiment run of one grid point and returns its statistics.
+
+  Nothing is written to the log or solution files. Evaluations per second count the evaluations the
+  runs actually did (search nodes for the exact solver). The peak memory is that of the whole
+  process, which is only this grid point's if the process runs nothing else (see run_sweep()).
+
+  Returns a dictionary holding the grid point's values and a value for each of TABLE_COLUMNS.
+  """
+  base_seed = experiment.get_base_seed(config)
+  num_runs = config.settings["num_experiment_runs"]
+  results = [experiment.run_experiment(config, run_count, experiment.get_run_seed(base_seed, run_count)) for run_count in range(1, num_runs + 1)]
+
+  num_cells = sum(result['num_cells'] for result in results)
+  generation_time = sum(result['generation_time'] for result in results)
+  search_time = sum(result['search_time'] for result in results)
+  num_evals = sum(result['num_evals'] for result in results)
+  evals_per_sec = num_evals / search_time if search_time else 0.0
+
+  return {'values': values,
+          'mean cells': num_cells / num_runs,
+          'mean black squares': sum(result['num_black_squares'] for result in results) / num_runs,
+          'generation time (s)': generation_time / num_runs,
+          'generation us/cell': 1e6 * generation_time / num_cells,
+          'evals/sec': evals_per_sec,
+          'cells x evals/sec': evals_per_sec * num_cells / num_runs,
+          'mean best fitness': sum(result['max_run_fitness'] for result in results) / num_runs,
+          'best fitness': max(result['max_run_fitness'] for result in results),
+          'peak memory (MB)': get_peak_memory() / 2 ** 20}
+
+
+def run_sweep_point_args(args):
+  """Calls run_sweep_point() with the argument tuple args (used with process pools)."""
+  return run_sweep_point(*args)
+
+
+def format_table_value(value):
+  """Returns value as it is written in the sweep table."""
+  if isinstance(value, float):
+    return '%.6g' % value
+
+  if isinstance(value, list):
+    return json.dumps(value)
+
+  return str(value)
+
+
+def run_sweep(config, grids, num_workers):
+  """Runs the search on every combination of the parameter grids and writes one table of the results.
+
+  grids is a list of (setting, list of values) pairs (see parse_grids()). The grid points are spread
+  across a pool of num_workers processes, each grid point getting a fresh process so its peak memory
+  is its own. The table is written to sweep_table_file_path, tab-separated with one row per grid
+  point (in grid order) and a column per swept setting followed by TABLE_COLUMNS. Along a board
+  size axis, evals/sec falling faster than the cell count grows shows up as a falling
+  'cells x evals/sec' (and a rising 'generation us/cell' for board generation).
+
+  Returns the list of grid point statistics (see run_sweep_point()).
+  """
+  points = get_grid_points(config, grids)
+  pool = multiprocessing.Pool(max(1, num_workers), maxtasksperchild=1)
+  rows = []
+
+  try:
+    with open(config.settings["sweep_table_file_path"], 'w') as table_file:
+      table_file.write('\t'.join([key for key, values in grids] + TABLE_COLUMNS) + '\n')
+
+      for row in pool.imap(run_sweep_point_args, [(point_config, values) for values, point_config in points]):
+        table_file.write('\t'.join(format_table_value(value) for value in row['values'] + [row[column] for column in TABLE_COLUMNS]) + '\n')
+        table_file.flush()
+        rows.append(row)
+
+  finally:
+    pool.close()
+    pool.join()
+
+  return rows
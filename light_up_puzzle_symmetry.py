@@ -0,0 +1,132 @@
+import hashlib
+import struct
+import light_up_puzzle_binary as binary
+
+
+# The 8 symmetries of a grid (the identity, 3 rotations and 4 reflections), as functions from the
+# number of rows and columns to the number of rows and columns of the transformed grid and a
+# function giving the (row, col) each square (row, col) of the transformed grid is taken from
+TRANSFORMS = [
+  lambda num_rows, num_cols: (num_rows, num_cols, lambda row, col: (row, col)),
+  lambda num_rows, num_cols: (num_rows, num_cols, lambda row, col: (row, num_cols - 1 - col)),
+  lambda num_rows, num_cols: (num_rows, num_cols, lambda row, col: (num_rows - 1 - row, col)),
+  lambda num_rows, num_cols: (num_rows, num_cols, lambda row, col: (num_rows - 1 - row, num_cols - 1 - col)),
+  lambda num_rows, num_cols: (num_cols, num_rows, lambda row, col: (col, row)),
+  lambda num_rows, num_cols: (num_cols, num_rows, lambda row, col: (num_rows - 1 - col, row)),
+  lambda num_rows, num_cols: (num_cols, num_rows, lambda row, col: (col, num_cols - 1 - row)),
+  lambda num_rows, num_cols: (num_cols, num_rows, lambda row, col: (num_rows - 1 - col, num_cols - 1 - row)),
+]
+
+FORM_HEADER = struct.Struct('<II')
+
+
+def get_permutations(num_rows, num_cols):
+  """Returns the 8 symmetries of a num_rows x num_cols grid as (num_rows, num_cols, cells) triples.
+
+  cells lists, for each square of the transformed grid in row-major order, the square of the
+  original grid it is taken from. The first symmetry is the identity. The last 4 swap rows and
+  columns, so they only map a grid onto itself if it is square.
+  """
+  permutations = []
+
+  for transform in TRANSFORMS:
+    new_num_rows, new_num_cols, get_source = transform(num_rows, num_cols)
+    cells = []
+
+    for row in range(new_num_rows):
+      for col in range(new_num_cols):
+        source_row, source_col = get_source(row, col)
+        cells.append(source_row * num_cols + source_col)
+
+    permutations.append((new_num_rows, new_num_cols, cells))
+
+  return permutations
+
+
+def get_grid(board, include_bulbs):
+  """Returns the cell values of board (a LightUpPuzzleBoard), with bulbs marked as in binary puzzle files if include_bulbs is set."""
+  grid = bytearray(board.cells)
+
+  if include_bulbs:
+    for cell in board.get_bulb_cells():
+      grid[cell] = binary.BULB_SQUARE
+
+  return grid
+
+
+def get_canonical_form(board, include_bulbs=False, permutations=None):
+  """Returns the canonical form of board (a LightUpPuzzleBoard), or of board and its bulbs if include_bulbs is set.
+
+  The canonical form is the smallest of the board's 8 rotations and reflections, each written as its
+  number of rows and columns followed by its cell values, so two boards (and bulb layouts) have the
+  same canonical form exactly when one is a rotation or reflection of the other. permutations may be
+  the board's get_permutations() to save computing them again.
+  """
+  grid = get_grid(board, include_bulbs)
+
+  if permutations is None:
+    permutations = get_permutations(board.num_rows, board.num_cols)
+
+  return min(FORM_HEADER.pack(num_rows, num_cols) + bytes(map(grid.__getitem__, cells)) for num_rows, num_cols, cells in permutations)
+
+
+def get_board_symmetries(board, permutations=None):
+  """Returns the symmetries other than the identity that map board's squares onto themselves.
+
+  Each is given as a list holding, for every square, the square it is mapped to. Bulbs are ignored.
+  """
+  grid = bytes(board.cells)
+  symmetries = []
+
+  if permutations is None:
+    permutations = get_permutations(board.num_rows, board.num_cols)
+
+  for num_rows, num_cols, cells in permutations[1:]:
+    if num_rows == board.num_rows and bytes(map(grid.__getitem__, cells)) == grid:
+      targets = [0] * board.num_cells
+
+      for cell, source_cell in enumerate(cells):
+        targets[source_cell] = cell
+
+      symmetries.append(targets)
+
+  return symmetries
+
+
+class LightUpPuzzleBoardIndex:
+  def __init__(self):
+    """Initializes the board index class.
+
+    The index holds the canonical forms (see get_canonical_form()) of the boards added to it, stored
+    as 64-bit hashes so it stays small and can be written as JSON, and counts the boards rejected
+    for matching one of them.
+    """
+    self.board_hashes = set()
+    self.num_skipped_duplicates = 0
+
+
+  def add(self, board):
+    """Adds board (a LightUpPuzzleBoard) to the index.
+
+    Returns True if it was added, False (counting a skipped duplicate) if the index already holds it
+    or one of its rotations or reflections.
+    """
+    form_hash = int.from_bytes(hashlib.blake2b(get_canonical_form(board), digest_size=8).digest(), 'little')
+
+    if form_hash in self.board_hashes:
+      self.num_skipped_duplicates += 1
+      return False
+
+    self.board_hashes.add(form_hash)
+    return True
+
+
+  def get_state(self):
+    """Returns the index contents and statistics in a form that can be written as JSON."""
+    return {'board_hashes': sorted(self.board_hashes), 'num_skipped_duplicates': self.num_skipped_duplicates}
+
+
+  def set_state(self, state):
+    """Restores index contents and statistics returned by get_state()."""
+    self.board_hashes = set(state['board_hashes'])
+    self.num_skipped_duplicates = state['num_skipped_duplicates']
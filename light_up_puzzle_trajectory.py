@@ -0,0 +1,66 @@
+import os
+import numpy as np
+
+
+# A trajectory file is a 2D .npy array of int32. Row 0 holds the evaluation numbers the trajectory is
+# sampled at (every trajectory_interval evaluations, and the last evaluation); row run_count holds
+# the best fitness run run_count had reached by each of those evaluations. gen_graphs.py reads it.
+TRAJECTORY_DTYPE = np.int32
+
+
+def get_sample_evals(num_evals, interval):
+  """Returns the evaluation numbers a trajectory of a num_evals evaluation run is sampled at."""
+  return np.minimum(np.arange(1, -(-num_evals // interval) + 1, dtype=np.int64) * interval, num_evals)
+
+
+def get_trajectory(fitness_history, sample_evals):
+  """Returns the best fitness reached by each evaluation in sample_evals.
+
+  fitness_history is a run's list of [evaluation, fitness] improvements (see
+  LightUpPuzzleLog.record_fitness()), in evaluation order. The fitness is 0 before the first one.
+  """
+  if not fitness_history:
+    return np.zeros(len(sample_evals), dtype=TRAJECTORY_DTYPE)
+
+  history = np.array(fitness_history, dtype=np.int64)
+  positions = np.searchsorted(history[:, 0], sample_evals, side='right') - 1
+
+  return np.where(positions >= 0, history[positions, 1], 0).astype(TRAJECTORY_DTYPE)
+
+
+class LightUpPuzzleTrajectoryFile:
+  def __init__(self, config, resume=False):
+    """Initializes the trajectory file class.
+
+    The file at trajectory_file_path is memory-mapped with room for every run of the experiment,
+    sampled every trajectory_interval evaluations (of num_fitness_evaluations). Each run's row is
+    flushed to disk as soon as it is written. If resume is set and the file exists with the same
+    layout, it is reopened so the rows of runs done before an interruption are kept.
+    """
+    self.file_path = config.settings["trajectory_file_path"]
+    self.sample_evals = get_sample_evals(config.settings["num_fitness_evaluations"], config.settings["trajectory_interval"])
+    shape = (config.settings["num_experiment_runs"] + 1, len(self.sample_evals))
+
+    if resume and os.path.exists(self.file_path):
+      self.array = np.load(self.file_path, mmap_mode='r+')
+
+      if self.array.shape == shape and np.array_equal(self.array[0], self.sample_evals):
+        return
+
+      del self.array
+
+    self.array = np.lib.format.open_memmap(self.file_path, mode='w+', dtype=TRAJECTORY_DTYPE, shape=shape)
+    self.array[0] = self.sample_evals
+    self.array.flush()
+
+
+  def write_run(self, run_count, fitness_history):
+    """Writes the trajectory of run run_count, given its list of [evaluation, fitness] improvements."""
+    self.array[run_count] = get_trajectory(fitness_history, self.sample_evals)
+    self.array.flush()
+
+
+  def close(self):
+    """Flushes and unmaps the file."""
+    self.array.flush()
+    del self.array
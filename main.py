@@ -1,60 +1,64 @@
+import argparse
+import os
 import sys
-import light_up_puzzle as puzzle_class
 import light_up_puzzle_config as config_class
+import light_up_puzzle_experiment as experiment
+import light_up_puzzle_server as server_class
+import light_up_puzzle_sweep as sweep
 
 
 if __name__ == '__main__':
 
-  if len(sys.argv) == 1:
-    # No config file provided, use default
-    config_file = 'config/default.cfg'
-  
-  else:
-    # Use the provided config file
-    config_file = sys.argv[1]
+  parser = argparse.ArgumentParser(description='Solves light up puzzles using random search.')
+  parser.add_argument('config_file', nargs='?', default='config/default.cfg', help='configuration file (default: config/default.cfg)')
+  parser.add_argument('--workers', type=int, help='number of worker processes (overrides num_worker_processes)')
+  parser.add_argument('--batch', metavar='PATH', help='solve every puzzle in a directory or manifest file instead of input_file_path')
+  parser.add_argument('--resume', action='store_true', help='continue an interrupted experiment from checkpoint_file_path')
+  parser.add_argument('--set', action='append', default=[], metavar='KEY=VALUE', help='override a configuration setting (VALUE is JSON or a plain string); may be repeated')
+  parser.add_argument('--sweep', action='append', default=[], metavar='KEY=[VALUE,...]', help='run every combination of these setting values and write a table of their speed, memory and fitness to sweep_table_file_path; may be repeated')
+  parser.add_argument('--serve', action='store_true', help='run jobs read as JSON lines from stdin, answering each on stdout (see light_up_puzzle_server.py)')
+  parser.add_argument('--socket', metavar='PATH', help='with --serve, accept jobs on a Unix domain socket at PATH instead of stdin')
+  args = parser.parse_args()
 
   # Get configuration parameters
-  config = config_class.LightUpPuzzleConfig(config_file)
-
-  # Open the log file and write the header
-  with open(config.settings["log_file_path"], 'w') as log:
-    log.write('Result Log\n\n')
-
-  max_global_fitness = 0
-
-  for run_count in range(1, config.settings["num_experiment_runs"] + 1):
-    # Create a new puzzle instance for this run
-    puzzle = puzzle_class.LightUpPuzzle(config) 
-    max_run_fitness = 0
-    fitness = 0
-    eval_count = 1
-
-    # Open the log file
-    with open(config.settings["log_file_path"], 'a') as log:
-
-      for eval_count in range(1, config.settings["num_fitness_evaluations"] + 1):
-        print("Run: %i\tEval count: %i" % (run_count, eval_count))
-
-        if not puzzle.place_bulb_randomly():
-          # There are no more options for placing bulbs. Clear the board of bulbs
-          puzzle.clear_board()
-
-        if puzzle.check_valid_solution():
-          fitness = puzzle.get_fitness()
-
-          if fitness > max_run_fitness:
-            max_run_fitness = fitness
-
-            # This is the best fitness we've found for this run
-            # Write it to the log file
-            log.write("Run %i\n" % run_count)
-            log.write("%i\t%i\n\n" % (eval_count, fitness))
-          
-          if fitness > max_global_fitness:
-            max_global_fitness = fitness
-
-            # This is the best fitness we've found overall
-            # Write it to the solution file
-            puzzle.write_to_soln_file()
-      
-      log.write('---------------------------\n\n')
+  try:
+    config = config_class.LightUpPuzzleConfig(args.config_file)
+    config.apply_overrides(args.set)
+    grids = sweep.parse_grids(args.sweep)
+    sweep.get_grid_points(config, grids)
+
+  except ValueError as error:
+    parser.error(str(error))
+
+  if args.workers is None:
+    num_workers = config.settings["num_worker_processes"]
+
+  else:
+    num_workers = args.workers
+
+  if args.batch and args.resume:
+    parser.error('--resume is not supported with --batch')
+
+  if args.sweep and (args.batch or args.resume):
+    parser.error('--sweep can not be combined with --batch or --resume')
+
+  if args.serve:
+    server = server_class.LightUpPuzzleServer(config)
+
+    if args.socket:
+      server.serve_socket(args.socket)
+
+    else:
+      # Responses get stdout to themselves; anything else printed (progress, best fitness) goes to stderr
+      response_stream = os.fdopen(os.dup(sys.stdout.fileno()), 'w')
+      os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+      server.serve(sys.stdin, response_stream)
+
+  elif args.sweep:
+    sweep.run_sweep(config, grids, num_workers)
+
+  elif args.batch:
+    experiment.run_batch(config, args.batch, num_workers)
+
+  else:
+    experiment.run_experiments(config, num_workers, args.resume)
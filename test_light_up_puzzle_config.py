@@ -0,0 +1,46 @@
+import os
+import pytest
+import light_up_puzzle_config as config_class
+
+
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config', 'default.cfg')
+
+
+def get_errors(overrides):
+  """Returns the errors of config/default.cfg with the settings in the dictionary overrides changed."""
+  config = config_class.LightUpPuzzleConfig(CONFIG_FILE)
+  config.settings.update(overrides)
+  return config.get_errors()
+
+
+def test_shipped_config_is_valid():
+  assert get_errors({}) == []
+
+
+def test_dont_care_value_without_matching_probabilities():
+  errors = get_errors({"adj_value_dont_care": 4})
+  assert len(errors) == 1 and "'black_square_value_probabilities'" in errors[0]
+
+
+def test_probabilities_without_matching_dont_care_value():
+  errors = get_errors({"black_square_value_probabilities": [0.5, 0.5]})
+  assert len(errors) == 1 and "'black_square_value_probabilities'" in errors[0]
+
+
+@pytest.mark.parametrize('value', [255, 300])
+def test_dont_care_value_must_be_below_white_square(value):
+  errors = get_errors({"adj_value_dont_care": value, "black_square_value_probabilities": [1.0 / value] * value})
+  assert len(errors) == 1 and "'adj_value_dont_care' must be below 255" in errors[0]
+
+
+def test_dont_care_value_must_be_at_least_1():
+  errors = get_errors({"adj_value_dont_care": 0, "black_square_value_probabilities": []})
+  assert len(errors) == 1 and "'adj_value_dont_care' must be at least 1" in errors[0]
+
+
+def test_bad_values_fail_validation_before_generation():
+  for override in ['adj_value_dont_care=4', 'adj_value_dont_care=300', 'black_square_value_probabilities=[0.5, 0.5]']:
+    config = config_class.LightUpPuzzleConfig(CONFIG_FILE)
+
+    with pytest.raises(ValueError):
+      config.apply_overrides([override])
@@ -0,0 +1,47 @@
+import os
+import numpy as np
+import light_up_puzzle as puzzle_class
+import light_up_puzzle_board as board_class
+import light_up_puzzle_config as config_class
+import light_up_puzzle_evolution as evolution_class
+
+
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config', 'default.cfg')
+
+
+def get_evolution():
+  """Returns an evolutionary search on a 5x5 board whose center 0 square makes propagation forbid its neighbours."""
+  config = config_class.LightUpPuzzleConfig(CONFIG_FILE)
+  config.settings.update({"enforce_adj_quotas": 1, "use_constraint_propagation": 1, "search_engine": 'evolution', "evolution_mutation_rate": 1.0})
+
+  cells = bytearray([board_class.WHITE_SQUARE]) * 25
+  cells[12] = 0
+  board = board_class.LightUpPuzzleBoard(5, 5, config.settings["adj_value_dont_care"], cells)
+
+  return evolution_class.LightUpPuzzleEvolution(puzzle_class.LightUpPuzzle(config, 1, board), config)
+
+
+def test_propagation_forbids_squares():
+  evolution = get_evolution()
+  assert evolution.forbidden_cells.tolist() == [cell in [7, 11, 13, 17] for cell in range(25)]
+
+
+def test_children_have_no_bulbs_on_forbidden_squares():
+  evolution = get_evolution()
+
+  # Parents with a bulb on every square
+  parents = np.ones((20, 25), dtype=bool)
+  children = evolution.crossover(parents[:10], parents[10:])
+  assert not (children & evolution.forbidden_cells).any()
+
+  evolution.mutate(children)
+  assert evolution.num_mutations == len(children)
+  assert not (children & evolution.forbidden_cells).any()
+
+
+def test_loaded_layouts_have_no_bulbs_on_forbidden_squares():
+  evolution = get_evolution()
+  evolution.load_layout(evolution.forbidden_cells)
+
+  assert not (evolution.get_layout() & evolution.forbidden_cells).any()
+  assert evolution.num_repaired_bulbs == 4